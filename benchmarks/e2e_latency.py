@@ -0,0 +1,213 @@
+"""
+End-to-end command latency, from transcript to response, with a per-stage breakdown.
+
+Replays benchmarks/corpus.txt (which covers every tag in config/training_data.json)
+through main.process_command_ml. Network and OS actions are replaced by stubs, so
+the numbers measure JARVIS itself and are comparable between machines and commits.
+Stages are timed by wrapping the functions that implement them:
+  preprocess  - IntentClassifier._preprocess_doc
+  classify    - IntentClassifier._probabilities_and_evidence
+  spacy       - registry.make_doc + registry.apply_components
+  entities    - processor.extract_entities
+  math_parse  - processor.parse_math_query
+  action      - the handler call, after resolution
+  total       - the whole process_command_ml call
+
+Run from the project root:
+    python -m benchmarks.e2e_latency [--repeat 5] [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+CORPUS_PATH = 'benchmarks/corpus.txt'
+TRAINING_DATA_PATH = 'config/training_data.json'
+STAGES = ('preprocess', 'classify', 'spacy', 'entities', 'math_parse', 'action', 'total')
+
+_samples = defaultdict(list)
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def _timed(stage, fn):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _samples[stage].append((time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+def instrument(main):
+    """Wraps each stage's implementation with a timer and stubs out every side effect."""
+    from jarvis_core.actions import system_control_ops, web_ops
+    from jarvis_core.ml.intent_classifier import IntentClassifier
+    from jarvis_core.nlp import processor, registry
+
+    IntentClassifier._preprocess_doc = _timed('preprocess', IntentClassifier._preprocess_doc)
+    IntentClassifier._probabilities_and_evidence = _timed('classify', IntentClassifier._probabilities_and_evidence)
+    registry.make_doc = _timed('spacy', registry.make_doc)
+    registry.apply_components = _timed('spacy', registry.apply_components)
+    processor.extract_entities = _timed('entities', processor.extract_entities)
+    processor.parse_math_query = _timed('math_parse', processor.parse_math_query)
+
+    stub = lambda name: lambda *args, **kwargs: f"[stubbed {name}]"
+    web_ops.get_weather_action = stub('weather')
+    main.action_handler['search_wikipedia'] = stub('wikipedia')
+    main.action_handler['open_target'] = stub('open')
+    main.action_handler['close_target'] = stub('close')
+    for name in ('set_volume', 'increase_volume', 'decrease_volume', 'mute_unmute_volume'):
+        setattr(system_control_ops, name, stub(name))
+    main.tts.speak = lambda text: None
+
+    original_resolve = main.resolve_command
+
+    def resolve_command(text):
+        intent, action = original_resolve(text)
+        return intent, _timed('action', action)
+    main.resolve_command = resolve_command
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'mean_ms': statistics.fmean(values) if values else 0.0,
+        'p50_ms': percentile(values, 0.50),
+        'p95_ms': percentile(values, 0.95),
+        'p99_ms': percentile(values, 0.99),
+        'max_ms': values[-1] if values else 0.0,
+    }
+
+
+def peak_rss_mb():
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS.
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def check_coverage(corpus, classifier):
+    """The tags in the training data that no corpus line is classified as."""
+    with open(TRAINING_DATA_PATH, 'r') as f:
+        tags = {intent['tag'] for intent in json.load(f)['intents']}
+    return sorted(tags - set(classifier.predict_batch(corpus)))
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} ({baseline.get('commit')}):")
+    print(f"{'stage':<12}{'p50':>10}{'p95':>10}")
+    for stage in STAGES:
+        old, new = baseline['stages'].get(stage), results['stages'].get(stage)
+        if not old or not new or not old['count'] or not new['count']:
+            continue
+        deltas = [(new[k] - old[k]) / old[k] * 100 if old[k] else 0.0 for k in ('p50_ms', 'p95_ms')]
+        print(f"{stage:<12}{deltas[0]:>+9.1f}%{deltas[1]:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=CORPUS_PATH, help='transcripts to replay, one per line')
+    parser.add_argument('--repeat', type=int, default=5, help='passes over the corpus')
+    parser.add_argument('--keep-cache', action='store_true', help='leave the NLP result cache on')
+    parser.add_argument('--json', metavar='PATH', help="write the results here ('-' for stdout)")
+    parser.add_argument('--compare', metavar='PATH', help='a previous --json result to diff against')
+    args = parser.parse_args()
+
+    import main as jarvis
+
+    corpus = load_corpus(args.corpus)
+    classifier = jarvis.processor.INTENT_CLASSIFIER.get()
+    if classifier is None:
+        raise SystemExit("No trained model found. Run train_model.py first.")
+    jarvis.processor.NLP.get()
+    if not args.keep_cache:
+        # Repeated passes would otherwise be answered from the NLP result cache.
+        jarvis.processor.NLP_CACHE.max_size = 0
+    uncovered = check_coverage(corpus, classifier)
+
+    instrument(jarvis)
+    # Keeps the actions' console messages out of the timings and the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        jarvis.process_command_ml(corpus[0])
+        _samples.clear()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for text in corpus:
+                jarvis.current_conversation_context = {}
+                command_start = time.perf_counter()
+                jarvis.process_command_ml(text)
+                _samples['total'].append((time.perf_counter() - command_start) * 1000)
+        elapsed = time.perf_counter() - start
+
+    commands = len(corpus) * args.repeat
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': args.corpus,
+        'commands': commands,
+        'repeat': args.repeat,
+        'nlp_cache': args.keep_cache,
+        'throughput_per_s': commands / elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+        'uncovered_tags': uncovered,
+        'stages': {stage: summarize(_samples[stage]) for stage in STAGES},
+    }
+
+    print(f"{len(corpus)} commands x {args.repeat} passes, {results['throughput_per_s']:.1f} commands/s, "
+          f"peak RSS {results['peak_rss_mb']:.1f} MB")
+    if uncovered:
+        print(f"Warning: no corpus line is classified as: {', '.join(uncovered)}")
+    print(f"{'stage':<12}{'calls':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in results['stages'].items():
+        print(f"{stage:<12}{s['count']:>7}{s['mean_ms']:>10.3f}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['p99_ms']:>10.3f}")
+
+    if args.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
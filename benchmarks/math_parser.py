@@ -0,0 +1,46 @@
+"""
+Latency of parse_math_query on its own.
+
+Replays the 'calculate' patterns from config/training_data.json through the
+lexer and parser and reports the per-query cost in microseconds.
+
+Run from the project root:
+    python -m benchmarks.math_parser [--repeat 200]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from jarvis_core.nlp._math_parser import parse_math_query
+
+TRAINING_DATA_PATH = 'config/training_data.json'
+
+
+def load_queries(path=TRAINING_DATA_PATH):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return [pattern for intent in data['intents'] if intent['tag'] == 'calculate' for pattern in intent['patterns']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help='passes over the queries')
+    args = parser.parse_args()
+
+    queries = load_queries()
+    samples = []
+    for _ in range(args.repeat):
+        for query in queries:
+            start = time.perf_counter()
+            parse_math_query(query)
+            samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+
+    print(f"{len(queries)} queries x {args.repeat} passes")
+    print(f"mean {statistics.fmean(samples):.1f} us, p50 {samples[len(samples) // 2]:.1f} us, "
+          f"p95 {samples[int(len(samples) * 0.95) - 1]:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
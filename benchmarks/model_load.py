@@ -0,0 +1,117 @@
+"""
+Intent model load time and memory: the joblib pipeline against the compact export.
+
+Each load runs in a fresh interpreter, so nothing is already imported or cached:
+  load       - importing the classifier module and load_model(), the startup cost
+  first      - scoring one (already preprocessed) command right after loading, which
+               is where the memory-mapped arrays get paged in
+  rss        - resident memory once the command has been scored, and the part of it
+               added since the interpreter had only imported NumPy
+  sklearn    - whether sklearn ended up imported at all
+Predictions of the two formats are also compared on every training pattern.
+
+Run from the project root (after train_model.py, which writes both formats):
+    python -m benchmarks.model_load [--repeat 5] [--model-path jarvis_core/ml/model]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MODEL_PATH = 'jarvis_core/ml/model'
+TRAINING_DATA_PATH = 'config/training_data.json'
+FORMATS = ('joblib', 'compact')
+
+# Runs in the child interpreter; prints one JSON line.
+CHILD = r"""
+import contextlib, json, sys, time
+import numpy
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * __import__('os').sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+baseline = rss_mb()
+with contextlib.redirect_stdout(sys.stderr):
+    start = time.perf_counter()
+    from jarvis_core.ml.intent_classifier import IntentClassifier
+    classifier = IntentClassifier()
+    ok = classifier.load_model(sys.argv[1], sys.argv[2])
+    loaded = time.perf_counter()
+    classifier._probabilities(["what is the weather in london"])
+    scored = time.perf_counter()
+print(json.dumps({
+    'ok': ok,
+    'format': 'compact' if classifier.compact is not None else 'joblib',
+    'load_ms': (loaded - start) * 1000,
+    'first_ms': (scored - loaded) * 1000,
+    'rss_mb': rss_mb(),
+    'rss_added_mb': rss_mb() - baseline,
+    'sklearn': 'sklearn' in sys.modules,
+}))
+"""
+
+
+def measure(model_path, model_format):
+    result = subprocess.run([sys.executable, '-c', CHILD, model_path, model_format],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def artifact_bytes(model_path, model_format):
+    if model_format == 'compact':
+        from jarvis_core.ml import compact_model
+
+        names = compact_model.ARRAY_FILES + (compact_model.MANIFEST_FILE,)
+    else:
+        names = ('intent_pipeline.joblib', 'label_encoder.joblib')
+    return sum(os.path.getsize(os.path.join(model_path, name)) for name in names)
+
+
+def check_parity(model_path):
+    """The largest probability difference between the formats over the training patterns, and how many top intents differ."""
+    from jarvis_core.ml.intent_classifier import IntentClassifier
+
+    with open(TRAINING_DATA_PATH, 'r') as f:
+        patterns = [p.lower() for intent in json.load(f)['intents'] for p in intent['patterns']]
+    joblib_model, compact = IntentClassifier(), IntentClassifier()
+    joblib_model.load_model(model_path, 'joblib')
+    compact.load_model(model_path, 'compact')
+    # Both formats take the same preprocessed text, so spaCy is not needed here.
+    expected, actual = joblib_model._probabilities(patterns), compact._probabilities(patterns)
+    return float(abs(expected - actual).max()), int((expected.argmax(axis=1) != actual.argmax(axis=1)).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per format')
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    args = parser.parse_args()
+
+    from jarvis_core.ml import compact_model
+
+    if not compact_model.exists(args.model_path):
+        raise SystemExit("No compact export found. Run train_model.py (or python -m jarvis_core.ml.compact_model).")
+
+    print(f"{'format':<9}{'size KB':>9}{'load ms':>10}{'first ms':>10}{'RSS MB':>9}{'+RSS MB':>9}  sklearn")
+    for model_format in FORMATS:
+        runs = [measure(args.model_path, model_format) for _ in range(args.repeat)]
+        median = lambda key: statistics.median(run[key] for run in runs)
+        print(f"{model_format:<9}{artifact_bytes(args.model_path, model_format) / 1024:>9.1f}"
+              f"{median('load_ms'):>10.1f}{median('first_ms'):>10.2f}{median('rss_mb'):>9.1f}"
+              f"{median('rss_added_mb'):>9.1f}  {'yes' if runs[0]['sklearn'] else 'no'}")
+
+    max_difference, disagreements = check_parity(args.model_path)
+    print(f"\nParity over the training patterns: max probability difference {max_difference:.2e}, "
+          f"{disagreements} different top intents")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Per-utterance NLP latency, before and after the minimal-pipeline change.
+
+Replays every pattern in config/training_data.json through three strategies:
+  full_x3  - the original flow: the classifier, the entity extractor and the
+             math parser each run the full spaCy pipeline on their own copy.
+             (The math parser no longer uses spaCy; its parse is still timed here.)
+  full_x1  - one full-pipeline parse shared by all three consumers.
+  minimal  - process_text_ml as it is now: tokenizer only, plus whatever
+             components extract_entities needs for the predicted intent.
+
+Run from the project root:
+    python -m benchmarks.nlp_latency [--repeat 3]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from jarvis_core.nlp import processor
+from jarvis_core.nlp._math_parser import parse_math_query
+from jarvis_core.nlp.registry import get_nlp
+
+TRAINING_DATA_PATH = 'config/training_data.json'
+
+
+def load_corpus(path=TRAINING_DATA_PATH):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return [pattern for intent in data['intents'] for pattern in intent['patterns']]
+
+
+def full_x3(text, nlp, classifier):
+    intent = classifier.predict(text, doc=nlp(text.lower()))
+    entities = processor.extract_entities(nlp(text), intent)
+    if intent == 'calculate':
+        nlp(text.lower())  # The math parser used to run its own full spaCy parse
+        entities['expression'] = parse_math_query(text)
+    return intent
+
+
+def full_x1(text, nlp, classifier):
+    doc = nlp(text)
+    intent = classifier.predict(text, doc=doc)
+    entities = processor.extract_entities(doc, intent)
+    if intent == 'calculate':
+        entities['expression'] = parse_math_query(text)
+    return intent
+
+
+def minimal(text, nlp, classifier):
+    return processor.process_text_ml(text)['intent']
+
+
+def time_strategy(strategy, corpus, nlp, classifier, repeat):
+    samples = []
+    for _ in range(repeat):
+        for text in corpus:
+            start = time.perf_counter()
+            strategy(text, nlp, classifier)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'mean_ms': statistics.fmean(samples),
+        'p50_ms': samples[len(samples) // 2],
+        'p95_ms': samples[int(len(samples) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the corpus per strategy')
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    # Repeated passes would otherwise be answered from the NLP result cache.
+    processor.NLP_CACHE.max_size = 0
+    nlp = get_nlp()
+    classifier = processor.INTENT_CLASSIFIER.get()
+    if classifier is None:
+        raise SystemExit("No trained model found. Run train_model.py first.")
+
+    print(f"{len(corpus)} utterances x {args.repeat} passes")
+    print(f"{'strategy':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, strategy in (('full_x3', full_x3), ('full_x1', full_x1), ('minimal', minimal)):
+        strategy(corpus[0], nlp, classifier)
+        result = time_strategy(strategy, corpus, nlp, classifier, args.repeat)
+        print(f"{name:<10}{result['mean_ms']:>10.3f}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
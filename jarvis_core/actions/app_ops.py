@@ -3,6 +3,10 @@ import subprocess
 import platform
 import os
 import json
+import logging
+from jarvis_core.utils.startup import LazyResource
+
+logger = logging.getLogger(__name__)
 
 RUNNING_PROCESSES = {}
 
@@ -18,7 +22,7 @@ def load_app_paths():
         print("Warning: Could not decode config/app_paths.json. Check for syntax errors.")
         return {}
 
-APP_PATHS = load_app_paths()
+APP_PATHS = LazyResource("app_paths", load_app_paths)
 
 def open_target_action(entities):
     """
@@ -30,7 +34,7 @@ def open_target_action(entities):
 
     target_lower = target_name.lower()
     os_name = platform.system().lower()
-    os_apps = APP_PATHS.get(os_name, {})
+    os_apps = APP_PATHS.get().get(os_name, {})
 
     app_key_to_open = None
 
@@ -48,7 +52,7 @@ def open_target_action(entities):
 
         app_path = os_apps[app_key_to_open]
         try:
-            print(f"DEBUG: Match found. Key: '{app_key_to_open}', Path: '{app_path}'")
+            logger.debug("Match found. Key: %r, Path: %r", app_key_to_open, app_path)
             proc = subprocess.Popen(app_path)
             RUNNING_PROCESSES[app_key_to_open] = proc
             return f"Opening {target_name}."
@@ -100,7 +104,7 @@ def close_target_action(entities):
     # Check if the process is still running before trying to kill it
     if proc.poll() is None:
         os_name = platform.system().lower()
-        print(f"DEBUG: Attempting to close '{target_name}' (PID: {proc.pid}) on {os_name}.")
+        logger.debug("Attempting to close %r (PID: %s) on %s.", target_name, proc.pid, os_name)
         try:
             if os_name == "windows":
                 # /F = Forcefully terminate, /T = Terminate child processes, /PID = specify Process ID
@@ -110,7 +114,7 @@ def close_target_action(entities):
 
             # Wait a moment for the process to terminate
             proc.wait(timeout=5)
-            print(f"DEBUG: Process for '{target_name}' terminated.")
+            logger.debug("Process for %r terminated.", target_name)
 
         except subprocess.TimeoutExpired:
             print(f"Warning: Process for '{target_name}' did not terminate within the timeout.")
@@ -119,7 +123,7 @@ def close_target_action(entities):
             print(f"Error closing application '{target_name}': {e}")
             return f"Sorry, I encountered an error trying to close {target_name}."
     else:
-        print(f"DEBUG: Process for '{target_name}' was already closed.")
+        logger.debug("Process for %r was already closed.", target_name)
 
     # Clean up the entry from our dictionary
     del RUNNING_PROCESSES[target_lower]
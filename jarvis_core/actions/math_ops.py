@@ -1,6 +1,12 @@
+import ast
+import functools
+import logging
 import math
+import operator
 import re
 
+logger = logging.getLogger(__name__)
+
 ALLOWED_MATH_NAMES = {
     "acos": math.acos, "asin": math.asin, "atan": math.atan, "atan2": math.atan2,
     "ceil": math.ceil, "cos": math.cos, "cosh": math.cosh, "degrees": math.degrees,
@@ -20,8 +26,91 @@ ALLOWED_MATH_NAMES = {
 ALLOWED_BUILTINS = {
     "abs": abs, "round": round, "float": float, "int": int, "pow": pow # pow is also in math
 }
-# Combine them into a single context for eval
-SAFE_EVAL_CONTEXT = {"__builtins__": ALLOWED_BUILTINS, **ALLOWED_MATH_NAMES}
+
+# What parse_math_query returns for a query it can't make sense of.
+UNPARSEABLE_EXPRESSION = "<unparseable>"
+FORMAT_PROBLEM_RESPONSE = "I couldn't understand the calculation format. Please rephrase."
+
+# Limits that keep a single (possibly misheard) calculation from pinning the CPU.
+MAX_FACTORIAL_ARGUMENT = 1000
+MAX_INTEGER_RESULT_BITS = 10000  # About 3000 decimal digits
+
+def _checked_factorial(n):
+    if n > MAX_FACTORIAL_ARGUMENT:
+        raise OverflowError(f"factorial argument {n} exceeds {MAX_FACTORIAL_ARGUMENT}")
+    return math.factorial(n)
+
+def _checked_power(base, exponent):
+    # Integer powers are exact and unbounded in Python, so estimate the size before computing.
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if exponent * base.bit_length() > MAX_INTEGER_RESULT_BITS:
+            raise OverflowError(f"{base} ** {exponent} is too large")
+    return base ** exponent
+
+# Every name a calculation may use. Math names shadow built-ins (so pow is math.pow),
+# and the unbounded operations are replaced by their checked versions.
+SAFE_NAMES = {**ALLOWED_BUILTINS, **ALLOWED_MATH_NAMES, "factorial": _checked_factorial}
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+    ast.Pow: _checked_power,
+}
+_UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+def _compile_node(node):
+    """Turns a whitelisted AST node into a zero-argument callable that computes its value."""
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body)
+
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        value = node.value
+        return lambda: value
+
+    if isinstance(node, ast.Name):
+        if node.id not in SAFE_NAMES:
+            raise NameError(f"name '{node.id}' is not allowed")
+        value = SAFE_NAMES[node.id]
+        return lambda: value
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        op = _BINARY_OPERATORS[type(node.op)]
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda: op(left(), right())
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        op = _UNARY_OPERATORS[type(node.op)]
+        operand = _compile_node(node.operand)
+        return lambda: op(operand())
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        func = _compile_node(node.func)
+        args = [_compile_node(arg) for arg in node.args]
+        return lambda: func()(*[arg() for arg in args])
+
+    raise SyntaxError(f"'{type(node).__name__}' is not allowed in a calculation")
+
+@functools.lru_cache(maxsize=512)
+def compile_expression(expression_string):
+    """
+    Parses and validates an expression once and returns a callable that evaluates it.
+    Only numbers, the arithmetic operators and the names in SAFE_NAMES are accepted;
+    anything else raises SyntaxError or NameError here, before any evaluation happens.
+    """
+    tree = ast.parse(expression_string.strip(), mode="eval")
+    return _compile_node(tree)
+
+def _format_result(result):
+    if isinstance(result, complex):
+        return f"The result is a complex number: {result}. I can only provide results for real numbers as of now!"
+    if isinstance(result, int) and result.bit_length() > MAX_INTEGER_RESULT_BITS:
+        raise OverflowError("integer result is too large")
+    if isinstance(result, float):
+        if result.is_integer():
+            result = int(result)  # Display as integer if it's like 5.0
+        else:
+            result = round(result, 6)
+    return f"The result is {result}"
 
 def evaluate_expression(expression_string):
     """
@@ -29,38 +118,248 @@ def evaluate_expression(expression_string):
     The expression_string should be one that is constructed carefully
     by the NLP to only use allowed functions and numbers.
     """
-    print(f"DEBUG: Math expression to evaluate: '{expression_string}'")
-    if not re.match(r"^[a-zA-Z0-9\s\.\+\-\*\/\%(\)\,\_]+$", expression_string):
-        pass
+    logger.debug("Math expression to evaluate: %r", expression_string)
+    return _evaluate(expression_string)
+
+def _evaluate(expression_string, failures=None):
+    """The message for one expression. Unexpected errors are logged, or appended to failures if given."""
+    if expression_string == UNPARSEABLE_EXPRESSION:
+        return FORMAT_PROBLEM_RESPONSE
     try:
-        result = eval(expression_string, SAFE_EVAL_CONTEXT, {})
-        if isinstance(result, complex):
-            return f"The result is a complex number: {result}. I can only provide results for real numbers as of now!"
-        if isinstance(result, float):
-            if result.is_integer():
-                result = int(result)  # Display as integer if it's like 5.0
-            else:
-                result = round(result, 6)
-        return f"The result is {result}"
+        return _format_result(compile_expression(expression_string)())
     except ZeroDivisionError:
         return "Sorry, I can't divide by zero."
     except OverflowError:
         return "The result of the calculation is too large to handle."
     except TypeError as e:
-        print(f"Math TypeError: {e} for expression '{expression_string}'")
+        logger.debug("Math TypeError: %s for expression %r", e, expression_string)
         return "There seems to be a problem with the numbers or functions in your calculation. Please check the format."
     except SyntaxError as e:
-        print(f"Math SyntaxError: {e} for expression '{expression_string}'")
-        return "I couldn't understand the calculation format. Please rephrase."
+        logger.debug("Math SyntaxError: %s for expression %r", e, expression_string)
+        return FORMAT_PROBLEM_RESPONSE
     except NameError as e:
-        print(
-            f"Math NameError: {e} for expression '{expression_string}' - an disallowed function/variable might have been used.")
+        logger.debug("Math NameError: %s for expression %r - a disallowed function/variable might have been used.",
+                     e, expression_string)
         return "Sorry, an unexpected error occurred with the calculation. Some functions might not be available."
     except Exception as e:
-        print(f"Unexpected math evaluation error: {e} for expression '{expression_string}'")
+        if failures is None:
+            logger.warning("Unexpected math evaluation error: %s for expression %r", e, expression_string)
+        else:
+            failures.append((expression_string, e))
         return "Sorry, an unexpected error occurred while trying to calculate that."
 
+
+# --- Bulk evaluation -------------------------------------------------------------
+
+# NumPy ufuncs mirroring ALLOWED_MATH_NAMES, used by evaluate_many. Names missing here
+# (factorial, frexp, round, int, ...) have no exact elementwise counterpart, so
+# expressions that use them are evaluated one at a time instead.
+NUMPY_FUNCTIONS = {
+    "acos": "arccos", "asin": "arcsin", "atan": "arctan", "atan2": "arctan2",
+    "ceil": "ceil", "cos": "cos", "cosh": "cosh", "degrees": "degrees",
+    "exp": "exp", "fabs": "fabs", "floor": "floor", "fmod": "fmod",
+    "hypot": "hypot", "log": "log", "log10": "log10", "log2": "log2",
+    "pow": "power", "radians": "radians", "sin": "sin", "sinh": "sinh",
+    "sqrt": "sqrt", "tan": "tan", "tanh": "tanh", "ln": "log", "abs": "absolute",
+}
+# These give bit-identical results in NumPy and math; anything else may differ in the last ulp.
+_EXACT_NUMPY_FUNCTIONS = {"ceil", "fabs", "floor", "fmod", "abs"}
+_NUMPY_BINARY_OPERATORS = {
+    ast.Add: "add", ast.Sub: "subtract", ast.Mult: "multiply", ast.Div: "true_divide",
+    ast.FloorDiv: "floor_divide", ast.Mod: "remainder", ast.Pow: "power",
+}
+_NUMPY_UNARY_OPERATORS = {ast.UAdd: "positive", ast.USub: "negative"}
+# Python ints beyond this are not exact as float64, so the scalar path has to handle them.
+_FLOAT_EXACT_LIMIT = 2 ** 53
+# Above this, rounding to six decimals no longer hides ulp-level differences in results
+# from functions NumPy and math implement differently.
+_INEXACT_MAGNITUDE_LIMIT = 1e6
+# Groups smaller than this are cheaper to evaluate one by one than to vectorize.
+VECTORIZE_MIN_GROUP = 8
+
+# Plain decimal literals; anything fancier (hex, underscores) stays in the template text
+# and ends up on the scalar path.
+_NUMBER_PATTERN = re.compile(r"(?<![\w.])(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)")
+# Longer literals might be integers that float64 can't hold exactly.
+_MAX_VECTOR_LITERAL_LENGTH = 15
+
+def _split_template(expression_string):
+    """
+    Splits an expression into a template key and its numbers: expressions with the
+    same key differ only in their numbers, e.g. 'sin(radians(30))' and 'sin(radians(45))'.
+    Returns None when the expression is not a candidate for vectorizing.
+    """
+    if "__constant" in expression_string:
+        return None
+    parts = _NUMBER_PATTERN.split(expression_string.strip())
+    numbers = parts[1::2]
+    if any(len(number) > _MAX_VECTOR_LITERAL_LENGTH for number in numbers):
+        return None
+    return "\0".join(parts[0::2]), numbers
+
+def _parse_template(key):
+    """Parses a template key, with each number replaced by a __constantN__ placeholder."""
+    pieces = key.split("\0")
+    source = pieces[0] + "".join(f"__constant{i}__{piece}" for i, piece in enumerate(pieces[1:]))
+    return ast.parse(source, mode="eval")
+
+def _compile_vector_node(node, np):
+    """
+    Like _compile_node, but the callable takes an array of constant columns and returns
+    an array. Returns (callable, exact) or None if the node can't be vectorized.
+    """
+    if isinstance(node, ast.Expression):
+        return _compile_vector_node(node.body, np)
+
+    if isinstance(node, ast.Name) and node.id.startswith("__constant"):
+        index = int(node.id[len("__constant"):-2])
+        return (lambda columns: columns[index]), True
+
+    if isinstance(node, ast.Name) and isinstance(SAFE_NAMES.get(node.id), float):
+        value = SAFE_NAMES[node.id]  # pi and e
+        return (lambda columns: value), True
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _NUMPY_BINARY_OPERATORS:
+        left = _compile_vector_node(node.left, np)
+        right = _compile_vector_node(node.right, np)
+        if left is None or right is None:
+            return None
+        ufunc = getattr(np, _NUMPY_BINARY_OPERATORS[type(node.op)])
+        (left_fn, left_exact), (right_fn, right_exact) = left, right
+        exact = left_exact and right_exact and not isinstance(node.op, ast.Pow)
+        return (lambda columns: ufunc(left_fn(columns), right_fn(columns))), exact
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _NUMPY_UNARY_OPERATORS:
+        operand = _compile_vector_node(node.operand, np)
+        if operand is None:
+            return None
+        ufunc = getattr(np, _NUMPY_UNARY_OPERATORS[type(node.op)])
+        operand_fn, exact = operand
+        return (lambda columns: ufunc(operand_fn(columns))), exact
+
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id in NUMPY_FUNCTIONS and not node.keywords):
+        args = [_compile_vector_node(arg, np) for arg in node.args]
+        if any(arg is None for arg in args):
+            return None
+        ufunc = getattr(np, NUMPY_FUNCTIONS[node.func.id])
+        if ufunc.nin != len(args):
+            return None
+        arg_fns = [fn for fn, _ in args]
+        exact = node.func.id in _EXACT_NUMPY_FUNCTIONS and all(arg_exact for _, arg_exact in args)
+        return (lambda columns: ufunc(*[fn(columns) for fn in arg_fns])), exact
+
+    return None
+
+def _near_formatting_boundary(np, values):
+    """
+    Values where a few-ulp difference between NumPy and math could change the
+    formatted message: close to an integer (printed as 5 vs 5.0) or close to a
+    rounding tie at the sixth decimal.
+    """
+    near_integer = np.isclose(values, np.round(values), rtol=1e-12, atol=1e-12)
+    scaled = np.abs(values) * 1e6
+    near_tie = np.isclose(scaled - np.floor(scaled), 0.5, rtol=0, atol=1e-3)
+    return near_integer | near_tie
+
+def _evaluate_group(np, key, constants_rows):
+    """
+    Evaluates one group of same-shaped expressions with NumPy. Returns a message per
+    row, or None for rows that must go through the scalar path to get exactly the
+    message (and error) evaluate_expression would give.
+    """
+    try:
+        compiled = _compile_vector_node(_parse_template(key), np)
+    except SyntaxError:
+        compiled = None
+    if compiled is None:
+        return [None] * len(constants_rows)
+    fn, exact = compiled
+
+    columns = np.array(constants_rows, dtype=np.float64).T.reshape(-1, len(constants_rows))
+    with np.errstate(all="ignore"):
+        values = np.broadcast_to(np.asarray(fn(columns), dtype=np.float64), (len(constants_rows),))
+        # Division by zero, domain errors and overflow show up as inf/nan here; the
+        # scalar path turns them into the proper messages. Large values may have lost
+        # integer precision that Python's exact ints would keep.
+        unsafe = ~np.isfinite(values) | (np.abs(values) >= _FLOAT_EXACT_LIMIT)
+        if not exact:
+            unsafe |= _near_formatting_boundary(np, values) | (np.abs(values) >= _INEXACT_MAGNITUDE_LIMIT)
+
+    return [None if bad else _format_result(value) for value, bad in zip(values.tolist(), unsafe.tolist())]
+
+def evaluate_many(expressions):
+    """
+    Evaluates a list of expressions and returns one message per expression, exactly
+    as evaluate_expression would, without its per-call debug log.
+    Expressions that differ only in their numbers are evaluated together with NumPy
+    ufuncs; everything else (and any row NumPy can't reproduce exactly) goes through
+    the compiled scalar evaluator.
+    """
+    expressions = list(expressions)
+    results = [None] * len(expressions)
+
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    if np is not None:
+        groups = {}
+        for index, expression in enumerate(expressions):
+            template = _split_template(expression)
+            if template is not None:
+                key, numbers = template
+                group = groups.setdefault(key, ([], []))
+                group[0].append(index)
+                group[1].append(numbers)
+
+        for key, (indexes, constants_rows) in groups.items():
+            if len(indexes) < VECTORIZE_MIN_GROUP:
+                continue
+            for index, message in zip(indexes, _evaluate_group(np, key, constants_rows)):
+                results[index] = message
+
+    failures = []
+    messages = [message if message is not None else _evaluate(expressions[index], failures)
+                for index, message in enumerate(results)]
+    if failures:
+        # One warning per batch; a file of out-of-domain inputs would otherwise flood the log.
+        expression, error = failures[0]
+        logger.warning("Unexpected math evaluation errors in %d of %d expressions, the first: %s for expression %r",
+                       len(failures), len(expressions), error, expression)
+    return messages
+
+def _run_batch(path, parse_queries=False):
+    """Command-line bulk mode: one expression (or spoken query) per line in, one message per line out."""
+    import sys
+
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r") as f:
+            lines = f.read().splitlines()
+
+    expressions = [line for line in lines if line.strip()]
+    if parse_queries:
+        from jarvis_core.nlp._math_parser import parse_math_query
+        expressions = [parse_math_query(query) for query in expressions]
+
+    sys.stdout.write("".join(f"{message}\n" for message in evaluate_many(expressions)))
+    return 0
+
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate calculator expressions in bulk.")
+    parser.add_argument("file", nargs="?",
+                        help="file with one expression per line, or '-' for stdin; without it the self-test runs")
+    parser.add_argument("--parse", action="store_true",
+                        help="treat each line as a spoken query and run parse_math_query on it first")
+    args = parser.parse_args()
+    if args.file:
+        raise SystemExit(_run_batch(args.file, parse_queries=args.parse))
+
     # Test cases
     test_expressions = {
         "5 + 3": "The result is 8",
@@ -1,21 +1,24 @@
 import platform
 import subprocess
+from jarvis_core.utils.startup import LazyResource
 
 OS_NAME = platform.system().lower()
 
-if OS_NAME == "windows":
+def _create_volume_control():
+    if OS_NAME != "windows":
+        return None
     try:
         from comtypes import CLSCTX_ALL
         from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
         devices = AudioUtilities.GetSpeakers()
         interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-        VOLUME_CONTROL = interface.QueryInterface(IAudioEndpointVolume)
+        return interface.QueryInterface(IAudioEndpointVolume)
     except (ImportError, OSError) as e:
         print(f"Warning: pycaw library not found or failed to initialize: {e}. Windows volume control will not work.")
-        VOLUME_CONTROL = None
+        return None
 
-else:
-    VOLUME_CONTROL = None
+# The COM endpoint is only activated the first time the volume is actually touched.
+VOLUME_CONTROL = LazyResource("volume_control", _create_volume_control)
 
 def set_volume(level):
     if not (0 <= level <= 100):
@@ -23,9 +26,10 @@ def set_volume(level):
 
     try:
         if OS_NAME == "windows":
-            if not VOLUME_CONTROL: return "Windows volume control is not available."
+            volume_control = VOLUME_CONTROL.get()
+            if not volume_control: return "Windows volume control is not available."
 
-            VOLUME_CONTROL.SetMasterVolumeLevelScalar(level / 100.0, None)
+            volume_control.SetMasterVolumeLevelScalar(level / 100.0, None)
         elif OS_NAME == "darwin":  # macOS
             subprocess.run(["osascript", "-e", f"set volume output volume {level}"])
         elif OS_NAME == "linux":
@@ -39,10 +43,11 @@ def set_volume(level):
 def increase_volume(step=10):
     try:
         if OS_NAME == "windows":
-            if not VOLUME_CONTROL: return "Windows volume control is not available."
-            current_level_scalar = VOLUME_CONTROL.GetMasterVolumeLevelScalar()
+            volume_control = VOLUME_CONTROL.get()
+            if not volume_control: return "Windows volume control is not available."
+            current_level_scalar = volume_control.GetMasterVolumeLevelScalar()
             new_level_scalar = min(1.0, current_level_scalar + (step / 100.0))
-            VOLUME_CONTROL.SetMasterVolumeLevelScalar(new_level_scalar, None)
+            volume_control.SetMasterVolumeLevelScalar(new_level_scalar, None)
             return f"Increasing volume. New level is around {int(new_level_scalar * 100)}%."
         elif OS_NAME == "darwin":
             subprocess.run(["osascript", "-e", "set volume output volume (output volume of (current date)) + 10"])
@@ -57,10 +62,11 @@ def increase_volume(step=10):
 def decrease_volume(step=10):
     try:
         if OS_NAME == "windows":
-            if not VOLUME_CONTROL: return "Windows volume control is not available."
-            current_level_scalar = VOLUME_CONTROL.GetMasterVolumeLevelScalar()
+            volume_control = VOLUME_CONTROL.get()
+            if not volume_control: return "Windows volume control is not available."
+            current_level_scalar = volume_control.GetMasterVolumeLevelScalar()
             new_level_scalar = max(0.0, current_level_scalar - (step / 100.0))
-            VOLUME_CONTROL.SetMasterVolumeLevelScalar(new_level_scalar, None)
+            volume_control.SetMasterVolumeLevelScalar(new_level_scalar, None)
             return f"Decreasing volume. New level is around {int(new_level_scalar * 100)}%."
         elif OS_NAME == "darwin":
             subprocess.run(["osascript", "-e", "set volume output volume (output volume of (current date)) - 10"])
@@ -75,9 +81,10 @@ def decrease_volume(step=10):
 def mute_unmute_volume():
     try:
         if OS_NAME == "windows":
-            if not VOLUME_CONTROL: return "Windows volume control is not available."
-            is_muted = VOLUME_CONTROL.GetMute()
-            VOLUME_CONTROL.SetMute(not is_muted, None)
+            volume_control = VOLUME_CONTROL.get()
+            if not volume_control: return "Windows volume control is not available."
+            is_muted = volume_control.GetMute()
+            volume_control.SetMute(not is_muted, None)
             return "Volume muted." if not is_muted else "Volume unmuted."
         elif OS_NAME == "darwin":
             # This script toggles mute
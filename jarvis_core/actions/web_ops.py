@@ -1,16 +1,65 @@
+import queue
+import threading
+import time
 import requests
-import  wikipediaapi
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from jarvis_core.utils import config_loader
+from jarvis_core.utils.disk_cache import DiskCache
+from jarvis_core.utils.startup import LazyResource
+from jarvis_core.utils.ttl_cache import TTLCache
 from datetime import datetime, timezone
 
 api_keys = config_loader.load_api_keys()
 openweathermap_key = api_keys.get('openweathermap_api_key')
 
-wiki = wikipediaapi.Wikipedia(
-    language='en',
-    user_agent="VoiceAssistant/v1.0",
-    extract_format = wikipediaapi.ExtractFormat.WIKI
-)
+settings = config_loader.load_settings()
+# Overridable so the weather path can be pointed at a local stub server.
+WEATHER_API_URL = settings.get('openweathermap_base_url', "http://api.openweathermap.org/data/2.5/weather")
+HTTP_TIMEOUT_SECONDS = settings.get('http_timeout_seconds', 10)
+HTTP_MAX_RETRIES = settings.get('http_max_retries', 2)
+
+def _create_http_session():
+    """One keep-alive session for all web requests, retrying transient failures with backoff."""
+    retries = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "VoiceAssistant/v1.0"
+    return session
+
+HTTP_SESSION = LazyResource("http_session", _create_http_session)
+
+# Weather reports keyed on (normalized location, units); the same city is asked about over and over.
+WEATHER_CACHE = TTLCache(settings.get('weather_cache_ttl_seconds', 300))
+
+def _create_wiki_client():
+    import wikipediaapi
+
+    return wikipediaapi.Wikipedia(
+        language='en',
+        user_agent="VoiceAssistant/v1.0",
+        extract_format = wikipediaapi.ExtractFormat.WIKI,
+        timeout=HTTP_TIMEOUT_SECONDS
+    )
+
+WIKI = LazyResource("wikipedia", _create_wiki_client)
+
+# Trimmed Wikipedia summaries survive restarts on disk. An entry older than the TTL is still
+# answered from disk straight away, and refreshed from the network in the background.
+WIKI_SUMMARY_CACHE = DiskCache(config_loader.cache_dir('wikipedia_summaries.sqlite3'))
+WIKI_CACHE_TTL_SECONDS = settings.get('wikipedia_cache_ttl_seconds', 7 * 24 * 3600)
+
+_wiki_refresh_queue = queue.Queue()
+_wiki_refresh_pending = set()
+_wiki_refresh_lock = threading.Lock()
+_wiki_refresh_worker = None
 
 def kelvin_to_cel_fahren(kelvin):
     celsius = kelvin - 273.15
@@ -30,11 +79,15 @@ def get_weather_action(location, unit_preference="celsius"):
         api_units = "imperial"
         unit_symbol = "°F"
 
-    base_url = "http://api.openweathermap.org/data/2.5/weather?"
-    complete_url = f"{base_url}+&appid={openweathermap_key}&q={location}&units={api_units}"
+    cache_key = (" ".join(location.lower().split()), api_units)
+    cached_report = WEATHER_CACHE.get(cache_key)
+    if cached_report is not None:
+        return cached_report
+
+    params = {"appid": openweathermap_key, "q": location, "units": api_units}
 
     try:
-        response = requests.get(complete_url, timeout=10)
+        response = HTTP_SESSION.get().get(WEATHER_API_URL, params=params, timeout=HTTP_TIMEOUT_SECONDS)
         response.raise_for_status()  # Raises an HTTPError for bad responses (4XX or 5XX)
         data = response.json()
 
@@ -58,18 +111,93 @@ def get_weather_action(location, unit_preference="celsius"):
         sunset_time = datetime.fromtimestamp(sunset_timestamp, tz=timezone.utc).strftime(
             '%Y-%m-%d %I:%M:%S%p') if sunset_timestamp else "N/A"
 
-        return (f"Temperature in {city_name} is: {temp}{unit_symbol}\n"
-                f"Temperature feels like: {feels_like}{unit_symbol}\n"
-                f"Humidity is {humidity}%\n"
-                f"General weather : {weather_desc}\n"
-                f"Sun risen at {sunrise_time}\n"
-                f"Sun will set at {sunset_time}")
+        report = (f"Temperature in {city_name} is: {temp}{unit_symbol}\n"
+                  f"Temperature feels like: {feels_like}{unit_symbol}\n"
+                  f"Humidity is {humidity}%\n"
+                  f"General weather : {weather_desc}\n"
+                  f"Sun risen at {sunrise_time}\n"
+                  f"Sun will set at {sunset_time}")
+        WEATHER_CACHE.put(cache_key, report)
+        return report
 
     except requests.exceptions.RequestException as e:
         print(f"Weather API request error: {e}")
+        return f"Sorry, I couldn't reach the weather service for {location} right now."
 
     except Exception as e:
         print(f"An unexpected error occurred in get_weather_action: {e}")
+        return f"Sorry, something went wrong while getting the weather for {location}."
+
+def _normalize_query(query):
+    return " ".join(query.lower().split())
+
+def _fetch_wikipedia_summary(query, cancelled=None):
+    """
+    Looks the page up live and returns its first two sentences.
+    Returns None if there is no such page; network errors are raised to the caller.
+    Nothing is cached if cancelled is set by the time the page has arrived.
+    """
+    page = WIKI.get().page(query)
+    if not page.exists():
+        return None
+
+    # Taking the first few sentences of the summary.
+    # The summary from wikipedia-api might be long.
+    summary_sentences = page.summary.split('. ')
+    if len(summary_sentences) > 2:
+        short_summary = ". ".join(summary_sentences[:2]) + "."
+    else:
+        short_summary = page.summary
+
+    if short_summary and not (cancelled is not None and cancelled.is_set()):
+        WIKI_SUMMARY_CACHE.put(_normalize_query(query), short_summary)
+    return short_summary
+
+def _refresh_wikipedia_summaries():
+    while True:
+        query = _wiki_refresh_queue.get()
+        try:
+            _fetch_wikipedia_summary(query)
+        except Exception as e:
+            # Offline or slow: the stale entry stays and is tried again on a later lookup.
+            print(f"Wikipedia background refresh failed for '{query}': {e}")
+        finally:
+            with _wiki_refresh_lock:
+                _wiki_refresh_pending.discard(_normalize_query(query))
+
+def _schedule_wikipedia_refresh(query):
+    global _wiki_refresh_worker
+    with _wiki_refresh_lock:
+        key = _normalize_query(query)
+        if key in _wiki_refresh_pending:
+            return
+        _wiki_refresh_pending.add(key)
+        if _wiki_refresh_worker is None:
+            _wiki_refresh_worker = threading.Thread(
+                target=_refresh_wikipedia_summaries, name="wiki-refresh", daemon=True)
+            _wiki_refresh_worker.start()
+    _wiki_refresh_queue.put(query)
+
+def warm_weather_connection():
+    """Opens a pooled connection to the weather API ahead of a lookup, so it skips the handshake."""
+    try:
+        HTTP_SESSION.get().head(WEATHER_API_URL, timeout=HTTP_TIMEOUT_SECONDS)
+    except requests.exceptions.RequestException as e:
+        print(f"Weather API warm-up failed: {e}")
+
+def prefetch_wikipedia_summary(query, cancelled=None):
+    """
+    Fetches a summary into the disk cache before search_wikipedia_action asks for it.
+    Skipped if a fresh copy is already cached, and dropped if cancelled is set before it is stored.
+    """
+    if not query:
+        return
+    cached = WIKI_SUMMARY_CACHE.get(_normalize_query(query))
+    if cached is not None and time.time() - cached[1] <= WIKI_CACHE_TTL_SECONDS:
+        return
+    if cancelled is not None and cancelled.is_set():
+        return
+    _fetch_wikipedia_summary(query, cancelled)
 
 def search_wikipedia_action(entities):
     """Searches Wikipedia for the given query entity and returns a summary."""
@@ -78,17 +206,20 @@ def search_wikipedia_action(entities):
         return "What would you like me to search on Wikipedia?"
 
     try:
-        page = wiki.page(query)
-        if not page.exists():
-            return f"Sorry, I couldn't find a Wikipedia page for '{query}'."
+        cached = WIKI_SUMMARY_CACHE.get(_normalize_query(query))
+    except Exception as e:
+        print(f"Wikipedia cache error: {e}")
+        cached = None
+    if cached is not None:
+        short_summary, stored_at = cached
+        if time.time() - stored_at > WIKI_CACHE_TTL_SECONDS:
+            _schedule_wikipedia_refresh(query)
+        return f"According to Wikipedia, regarding '{query}': {short_summary}"
 
-        # Taking the first few sentences of the summary.
-        # The summary from wikipedia-api might be long.
-        summary_sentences = page.summary.split('. ')
-        if len(summary_sentences) > 2:
-            short_summary = ". ".join(summary_sentences[:2]) + "."
-        else:
-            short_summary = page.summary
+    try:
+        short_summary = _fetch_wikipedia_summary(query)
+        if short_summary is None:
+            return f"Sorry, I couldn't find a Wikipedia page for '{query}'."
 
         if not short_summary: # If summary is empty even if page exists
              return f"I found a page for '{query}' but it doesn't have a readily available summary."
@@ -0,0 +1,111 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TIMEOUT_RESPONSE = "Sorry, that is taking too long. Please try again later."
+ERROR_RESPONSE = "Sorry, something went wrong while handling that."
+
+
+class ActionJob:
+    """One submitted action. Whichever of completion, timeout or cancel comes first decides its response."""
+
+    def __init__(self, intent, timeout):
+        self.intent = intent
+        self.timeout = timeout
+        self.future = None
+        self._timer = None
+        self._settled = False
+        self._lock = threading.Lock()
+
+    @property
+    def settled(self):
+        return self._settled
+
+    def _settle(self):
+        with self._lock:
+            if self._settled:
+                return False
+            self._settled = True
+        if self._timer:
+            self._timer.cancel()
+        return True
+
+
+class ActionExecutor:
+    """
+    Runs action handlers on a small thread pool so a slow network lookup never blocks
+    the listen loop. Every handler gets a timeout; its response (or a timeout/error
+    message) is put on the responses queue for the TTS stage to speak.
+    Threads can't be killed, so a timed-out or cancelled handler is left to finish
+    on its own and its late result is dropped.
+    """
+
+    def __init__(self, max_workers=4, default_timeout=10, timeouts=None, responses=None):
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        # Pass a bounded queue to have workers wait for the TTS stage to catch up.
+        self.responses = responses if responses is not None else queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="action")
+        self._jobs = set()
+        self._jobs_lock = threading.Lock()
+
+    def submit(self, intent, thunk):
+        """Schedules thunk() for intent and returns its ActionJob."""
+        job = ActionJob(intent, self.timeouts.get(intent, self.default_timeout))
+        with self._jobs_lock:
+            self._jobs.add(job)
+        job._timer = threading.Timer(job.timeout, self._expire, args=(job,))
+        job._timer.daemon = True
+        job.future = self._pool.submit(self._run, job, thunk)
+        job._timer.start()
+        return job
+
+    def cancel(self, job):
+        """Drops a job's response; a job that hasn't started yet never runs."""
+        if job._settle():
+            if job.future:
+                job.future.cancel()
+            self._forget(job)
+            return True
+        return False
+
+    def cancel_all(self):
+        with self._jobs_lock:
+            jobs = list(self._jobs)
+        for job in jobs:
+            self.cancel(job)
+
+    def pending(self):
+        with self._jobs_lock:
+            return len(self._jobs)
+
+    def shutdown(self):
+        self.cancel_all()
+        # Unblock any worker still waiting on a full responses queue.
+        while True:
+            try:
+                self.responses.get_nowait()
+            except queue.Empty:
+                break
+        self._pool.shutdown(wait=False)
+
+    def _run(self, job, thunk):
+        try:
+            response = thunk()
+        except Exception as e:
+            print(f"Error in '{job.intent}' handler: {e}")
+            response = ERROR_RESPONSE
+        if job._settle():
+            self._forget(job)
+            self.responses.put((job.intent, response))
+
+    def _expire(self, job):
+        if job._settle():
+            print(f"'{job.intent}' handler timed out after {job.timeout}s.")
+            job.future.cancel()
+            self._forget(job)
+            self.responses.put((job.intent, TIMEOUT_RESPONSE))
+
+    def _forget(self, job):
+        with self._jobs_lock:
+            self._jobs.discard(job)
@@ -0,0 +1,74 @@
+import io
+import json
+import os
+import socketserver
+import sys
+
+
+def serve_lines(reader, writer, handle):
+    """
+    Runs handle(command) for each non-empty line and writes its result as one JSON line.
+    Stops after a result whose intent is "exit", or at the end of the input. If handle
+    raises, the line gets a result with an 'error' field and the next line is read.
+    """
+    for line in reader:
+        command = line.strip()
+        if not command:
+            continue
+        try:
+            result = handle(command)
+        except Exception as e:
+            result = {'command': command, 'intent': None, 'error': str(e)}
+        writer.write(json.dumps(result) + "\n")
+        writer.flush()
+        if result.get('intent') == 'exit':
+            return
+
+
+def _socket_handler(handle):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            reader = io.TextIOWrapper(self.rfile, encoding='utf-8')
+            writer = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+            try:
+                serve_lines(reader, writer, handle)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                writer.detach()
+                reader.detach()
+    return Handler
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def run_headless(source, handle, out=None):
+    """
+    Feeds commands to handle() without any audio devices. source is one of:
+      "-"               stdin (the default)
+      a file path       one command per line
+      "unix:/path"      a Unix socket; every connection is its own line-oriented session
+      "tcp:host:port"   the same over TCP
+    """
+    out = out or sys.stdout
+    if source in (None, '-'):
+        serve_lines(sys.stdin, out, handle)
+    elif source.startswith('unix:'):
+        path = source[len('unix:'):]
+        if os.path.exists(path):
+            os.remove(path)
+        server_class = type("_ThreadingUnixServer", (socketserver.ThreadingUnixStreamServer,), {'daemon_threads': True})
+        with server_class(path, _socket_handler(handle)) as server:
+            print(f"Headless: listening on unix socket {path}", file=sys.stderr)
+            server.serve_forever()
+    elif source.startswith('tcp:'):
+        host, _, port = source[len('tcp:'):].rpartition(':')
+        with _ThreadingTCPServer((host or '127.0.0.1', int(port)), _socket_handler(handle)) as server:
+            print(f"Headless: listening on tcp {host or '127.0.0.1'}:{port}", file=sys.stderr)
+            server.serve_forever()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            serve_lines(f, out, handle)
@@ -0,0 +1,176 @@
+"""
+A compact, memory-mappable export of the intent model, with inference in plain NumPy.
+
+The joblib artifact pickles the whole sklearn pipeline, so loading it imports sklearn
+and rebuilds TfidfVectorizer's vocabulary as a Python dict, one string object per
+n-gram. The compact artifact is a few flat .npy files instead:
+  intent_vocab.npy      the n-grams, UTF-8 encoded and sorted (looked up by binary search)
+  intent_idf.npy        the IDF weight of each n-gram, in vocabulary order
+  intent_coef.npy       the classifier weights, one row per n-gram and one column per intent
+  intent_intercept.npy  the classifier intercepts
+  intent_compact.json   the intent names and the vectorizer settings the above depend on
+Loading maps the arrays into memory instead of reading them, so only the rows a command
+actually touches are ever paged in.
+
+Convert an existing joblib model (needs sklearn) with:
+    python -m jarvis_core.ml.compact_model [model_path]
+"""
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "intent_compact.json"
+ARRAY_FILES = ("intent_vocab.npy", "intent_idf.npy", "intent_coef.npy", "intent_intercept.npy")
+
+# TfidfVectorizer settings that this module reproduces. Anything else is refused at export time.
+_SUPPORTED = {'analyzer': 'word', 'binary': False, 'norm': 'l2', 'preprocessor': None, 'tokenizer': None,
+              'stop_words': None, 'strip_accents': None, 'use_idf': True}
+
+
+def exists(model_path):
+    return os.path.exists(os.path.join(model_path, MANIFEST_FILE))
+
+
+def export(pipeline, tags, model_path):
+    """
+    Writes a fitted TfidfVectorizer + LogisticRegression pipeline in the compact format.
+    Raises ValueError for any other pipeline, after removing a previous export so it
+    can't be loaded in place of the new model.
+    """
+    manifest_path = os.path.join(model_path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    vectorizer, model = pipeline[0], pipeline[-1]
+    if not hasattr(vectorizer, 'vocabulary_') or not hasattr(vectorizer, 'idf_'):
+        raise ValueError("only the 'tfidf' featurizer has a vocabulary to export")
+    params = vectorizer.get_params()
+    unsupported = {key: params[key] for key, value in _SUPPORTED.items() if params[key] != value}
+    if unsupported:
+        raise ValueError(f"The compact format does not support these vectorizer settings: {unsupported}")
+
+    terms = np.array([term.encode('utf-8') for term in vectorizer.get_feature_names_out()])
+    order = np.argsort(terms, kind='stable')
+    arrays = {
+        "intent_vocab.npy": terms[order],
+        "intent_idf.npy": vectorizer.idf_[order],
+        # Stored feature-major, so the rows of one command's n-grams are contiguous reads.
+        "intent_coef.npy": np.ascontiguousarray(model.coef_.T[order]),
+        "intent_intercept.npy": model.intercept_,
+    }
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'tags': [str(tag) for tag in tags],
+        'lowercase': params['lowercase'],
+        'token_pattern': params['token_pattern'],
+        'ngram_range': list(params['ngram_range']),
+        'sublinear_tf': params['sublinear_tf'],
+    }
+    os.makedirs(model_path, exist_ok=True)
+    # A running JARVIS may have the current files memory-mapped, and truncating a mapped
+    # file kills it with SIGBUS. Each file is written beside its target and renamed over
+    # it, so existing mappings keep the old contents until they are dropped.
+    for name, array in arrays.items():
+        _replace(os.path.join(model_path, name), lambda f, array=array: np.save(f, array))
+    # The manifest goes last: its presence is what marks the export as complete.
+    _replace(manifest_path, lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+
+
+def _replace(path, write):
+    partial = path + ".tmp"
+    try:
+        with open(partial, 'wb') as f:
+            write(f)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+class CompactIntentModel:
+    """TF-IDF featurization and linear scoring over the exported arrays."""
+
+    def __init__(self, manifest, vocab, idf, coef, intercept):
+        self.tags = manifest['tags']
+        self.lowercase = manifest['lowercase']
+        self.token_pattern = re.compile(manifest['token_pattern'])
+        self.ngram_range = tuple(manifest['ngram_range'])
+        self.sublinear_tf = manifest['sublinear_tf']
+        self.vocab = vocab
+        self.idf = idf
+        self.coef = coef
+        self.intercept = intercept
+
+    @classmethod
+    def load(cls, model_path, mmap=True):
+        with open(os.path.join(model_path, MANIFEST_FILE), 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model version {manifest.get('format_version')}; re-run train_model.py")
+        mmap_mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(model_path, name), mmap_mode=mmap_mode) for name in ARRAY_FILES]
+        return cls(manifest, *arrays)
+
+    def _ngrams(self, text):
+        if self.lowercase:
+            text = text.lower()
+        tokens = self.token_pattern.findall(text)
+        min_n, max_n = self.ngram_range
+        ngrams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            ngrams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return ngrams
+
+    def _features(self, text):
+        """The vocabulary indices and L2-normalized TF-IDF weights of the n-grams in text."""
+        counts = {}
+        for ngram in self._ngrams(text):
+            encoded = ngram.encode('utf-8')
+            # Longer than any vocabulary entry, so it can't be in it (and would be truncated below).
+            if len(encoded) <= self.vocab.itemsize:
+                counts[encoded] = counts.get(encoded, 0) + 1
+        if not counts:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        keys = np.array(list(counts), dtype=self.vocab.dtype)
+        positions = np.searchsorted(self.vocab, keys)
+        found = positions < len(self.vocab)
+        found[found] = self.vocab[positions[found]] == keys[found]
+        indices = positions[found]
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))[found]
+        if self.sublinear_tf:
+            tf = np.log(tf) + 1
+        weights = tf * self.idf[indices]
+        norm = np.sqrt(np.dot(weights, weights))
+        return indices, weights / norm if norm else weights
+
+    def decision_function(self, processed_texts):
+        """
+        One row of logits per text (one logit per text for a two-intent model, like sklearn),
+        plus how many known n-grams each text had.
+        """
+        logits = np.empty((len(processed_texts), self.coef.shape[1]))
+        known = np.empty(len(processed_texts), dtype=np.intp)
+        for row, text in enumerate(processed_texts):
+            indices, weights = self._features(text)
+            logits[row] = weights @ self.coef[indices] + self.intercept
+            known[row] = len(indices)
+        return (logits[:, 0] if logits.shape[1] == 1 else logits), known
+
+
+def convert(model_path):
+    """Writes the compact export next to an existing joblib model."""
+    import joblib
+
+    pipeline = joblib.load(os.path.join(model_path, "intent_pipeline.joblib"))
+    label_encoder = joblib.load(os.path.join(model_path, "label_encoder.joblib"))
+    export(pipeline, label_encoder.inverse_transform(pipeline[-1].classes_), model_path)
+    print(f"Compact model written to {model_path}")
+
+
+if __name__ == '__main__':
+    convert(sys.argv[1] if len(sys.argv) > 1 else 'jarvis_core/ml/model')
@@ -1,31 +1,223 @@
+import hashlib
+import itertools
 import json
-import joblib
+import numpy as np
 import os
-import spacy
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import make_pipeline
-from sklearn.preprocessing import LabelEncoder
+from jarvis_core.ml import compact_model
+from jarvis_core.nlp.registry import get_nlp
+from jarvis_core.utils import config_loader, metrics
+
+SETTINGS = config_loader.load_settings()
+
+DEFAULT_BATCH_SIZE = 256
+# sklearn and joblib are imported only to train or to load the joblib artifact;
+# a model loaded from the compact export runs on NumPy alone.
+PIPELINE_FILE = "intent_pipeline.joblib"
+LABEL_ENCODER_FILE = "label_encoder.joblib"
+CALIBRATION_FILE = "intent_calibration.json"
+# Fingerprints of the (tag, pattern) pairs a model has been trained on, so that an
+# incremental update only has to learn the new ones.
+TRAINED_PATTERNS_FILE = "trained_patterns.json"
+
+# "tfidf": word 1-2 grams with a fitted vocabulary and LogisticRegression; the most accurate
+# on a small training set. "hashing": word 1-2 grams plus character 3-5 grams (within word
+# boundaries, so a misheard word still shares most of its features) hashed into a fixed
+# number of columns, with an SGD classifier that can keep learning via partial_fit.
+# Memory stays the same however many patterns are added.
+FEATURIZER = SETTINGS.get('intent_featurizer', 'tfidf')
+HASH_FEATURES = SETTINGS.get('intent_hash_features', 2 ** 15)
+# Passes over the data and mini-batch size when training the hashing model with partial_fit.
+SGD_EPOCHS = 10
+SGD_BATCH_SIZE = 64
+# An incremental update replays this many already-learnt patterns per new one, so the
+# model doesn't drift towards the new patterns and forget the rest.
+REHEARSAL_RATIO = 3
+# Every trained or loaded model gets a new version, so caches keyed on it go stale automatically.
+_MODEL_VERSIONS = itertools.count(1)
+# Share of the correctly classified held-out commands the chosen confidence threshold
+# must still accept; the rest of the held-out mistakes are what the threshold is for.
+THRESHOLD_RECALL = 0.95
+# Candidate softmax temperatures tried when calibrating, from very sharp to very flat.
+TEMPERATURE_GRID = np.exp(np.linspace(np.log(0.01), np.log(10.0), 200))
+
 
 class IntentClassifier:
-    def __init__(self):
+    # Only token text and is_punct are used, so the tokenizer alone is enough.
+    NLP_COMPONENTS = ()
+    # Predicted for text that shares no vocabulary with the training data ("blorp zzz"):
+    # the model has no evidence for any intent, calibrated or not.
+    NO_EVIDENCE_INTENT = 'unknown'
+
+    def __init__(self, nlp=None, featurizer=None):
+        self.featurizer = featurizer or FEATURIZER
+        self.pipeline = None
+        self.label_encoder = None
+        # Set instead of the two above when the model was loaded from the compact export.
+        self.compact = None
+        # Softmax temperature fitted at training time; None means the model was never calibrated.
+        self.temperature = None
+        # Confidence below which a prediction is not acted on, chosen on held-out commands
+        # by choose_confidence_threshold(); None if it never was.
+        self.confidence_threshold = None
+        self.model_version = 0
+        self.trained_patterns = set()
+        self._nlp = nlp
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = get_nlp()
+        return self._nlp
+
+    def _preprocess(self, text):
+        return self._preprocess_doc(self.nlp.make_doc(text))
+
+    def _preprocess_doc(self, doc):
+        return " ".join([token.lower_ for token in doc if not token.is_punct])
+
+    def _preprocess_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+        # Every component is disabled, so nlp.pipe only streams the texts through the tokenizer.
+        docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=self.nlp.pipe_names)
+        return [self._preprocess_doc(doc) for doc in docs]
+
+    def _new_pipeline(self):
+        from sklearn.pipeline import make_pipeline
+
+        if self.featurizer == 'hashing':
+            from sklearn.feature_extraction.text import HashingVectorizer
+            from sklearn.linear_model import SGDClassifier
+            from sklearn.pipeline import make_union
+
+            vectorizer = make_union(
+                HashingVectorizer(ngram_range=(1, 2), n_features=HASH_FEATURES, alternate_sign=False),
+                HashingVectorizer(analyzer='char_wb', ngram_range=(3, 5), n_features=HASH_FEATURES,
+                                  alternate_sign=False),
+            )
+            classifier = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+            return make_pipeline(vectorizer, classifier)
+        if self.featurizer != 'tfidf':
+            raise ValueError(f"Unknown intent featurizer '{self.featurizer}'; use 'tfidf' or 'hashing'.")
+
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+
         vectorizer = TfidfVectorizer(ngram_range=(1, 2))
         classifier = LogisticRegression(random_state=42, max_iter=200)
-        self.pipeline = make_pipeline(vectorizer, classifier)
-        self.label_encoder = LabelEncoder()
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            print("Downloading spaCy model...")
-            spacy.cli.download("en_core_web_sm")
-            self.nlp = spacy.load("en_core_web_sm")
+        return make_pipeline(vectorizer, classifier)
 
-    def _preprocess(self, text):
-        doc = self.nlp(text.lower())
-        return " ".join([token.text for token in doc if not token.is_punct])
+    @property
+    def incremental(self):
+        """Whether this model can learn new patterns without being retrained from scratch."""
+        return self.pipeline is not None and hasattr(self.pipeline[-1], 'partial_fit')
 
-    def train(self, data_path):
-        """Training the intent classifier model"""
+    def _fit_pipeline(self, pipeline, processed_patterns, encoded_tags):
+        if not hasattr(pipeline[-1], 'partial_fit'):
+            pipeline.fit(processed_patterns, encoded_tags)
+            return
+        # The hashing featurizer is stateless, so fitting it only validates its parameters.
+        pipeline[0].fit(processed_patterns[:1])
+        self._partial_fit(pipeline, processed_patterns, encoded_tags, SGD_EPOCHS, classes=np.unique(encoded_tags))
+
+    @staticmethod
+    def _partial_fit(pipeline, processed_patterns, encoded_tags, epochs, classes=None):
+        """Mini-batch SGD over the patterns in a shuffled order each epoch, never featurizing them all at once."""
+        rng = np.random.default_rng(42)
+        encoded_tags = np.asarray(encoded_tags)
+        for _ in range(epochs):
+            order = rng.permutation(len(processed_patterns))
+            for start in range(0, len(order), SGD_BATCH_SIZE):
+                batch = order[start:start + SGD_BATCH_SIZE]
+                features = pipeline[0].transform([processed_patterns[i] for i in batch])
+                pipeline[-1].partial_fit(features, encoded_tags[batch], classes=classes)
+
+    @property
+    def calibrated(self):
+        return self.temperature is not None
+
+    def _fit_temperature(self, processed_patterns, encoded_tags):
+        """
+        Fits a single softmax temperature on out-of-fold logits, so that the
+        probabilities reflect how often the model is actually right.
+        The heavily regularised LogisticRegression is far too flat on its own.
+        """
+        from sklearn.base import clone
+        from sklearn.model_selection import StratifiedKFold
+
+        n_splits = min(5, np.bincount(encoded_tags).min())
+        if n_splits < 2:
+            print("Not enough patterns per intent to calibrate confidence scores.")
+            return None
+
+        folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+        logits = np.zeros((len(encoded_tags), len(self.label_encoder.classes_)))
+        # Each fold is trained the same way as the final model, so the hashing model's
+        # logits come from partial_fit too.
+        for train_rows, test_rows in folds.split(processed_patterns, encoded_tags):
+            fold = clone(self.pipeline)
+            self._fit_pipeline(fold, [processed_patterns[i] for i in train_rows], encoded_tags[train_rows])
+            test_patterns = [processed_patterns[i] for i in test_rows]
+            logits[test_rows] = self._as_multiclass_logits(fold.decision_function(test_patterns))
+        rows = np.arange(len(encoded_tags))
+
+        def negative_log_likelihood(temperature):
+            return -np.log(self._softmax(logits / temperature)[rows, encoded_tags] + 1e-12).mean()
+
+        return float(min(TEMPERATURE_GRID, key=negative_log_likelihood))
+
+    @staticmethod
+    def _as_multiclass_logits(logits):
+        # Binary LogisticRegression returns one logit per sample instead of one per class.
+        if logits.ndim == 1:
+            return np.column_stack([np.zeros_like(logits), logits])
+        return logits
+
+    @staticmethod
+    def _softmax(logits):
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def _probabilities(self, processed_texts):
+        """
+        Calibrated class probabilities, one row per text, columns in tag order.
+        A text that shares no vocabulary with the training data carries no evidence
+        for any intent, so it gets a uniform distribution instead of the intercepts.
+        """
+        return self._probabilities_and_evidence(processed_texts)[0]
+
+    def _probabilities_and_evidence(self, processed_texts):
+        """_probabilities(), plus a boolean array marking the texts with no known features."""
+        if self.compact is not None:
+            logits, known = self.compact.decision_function(processed_texts)
+            # An uncalibrated LogisticRegression's predict_proba is the softmax at temperature 1.
+            probabilities = self._softmax(self._as_multiclass_logits(logits) / (self.temperature or 1.0))
+            no_evidence = known == 0
+        else:
+            features = self.pipeline[0].transform(processed_texts)
+            model = self.pipeline[-1]
+            if self.temperature is None:
+                probabilities = model.predict_proba(features)
+            else:
+                logits = self._as_multiclass_logits(model.decision_function(features))
+                probabilities = self._softmax(logits / self.temperature)
+            no_evidence = features.getnnz(axis=1) == 0
+
+        probabilities[no_evidence] = 1.0 / probabilities.shape[1]
+        return probabilities, no_evidence
+
+    def _predict_processed(self, processed_texts):
+        # The most probable tag, so that predict() always agrees with predict_top_k().
+        probabilities, no_evidence = self._probabilities_and_evidence(processed_texts)
+        tags = self._tags()
+        return [self.NO_EVIDENCE_INTENT if unseen else tags[i]
+                for i, unseen in zip(probabilities.argmax(axis=1), no_evidence)]
+
+    def _tags(self):
+        if self.compact is not None:
+            return self.compact.tags
+        return [str(tag) for tag in self.label_encoder.inverse_transform(self.pipeline[-1].classes_)]
+
+    @staticmethod
+    def _load_training_data(data_path):
         with open(data_path, 'r') as f:
             data = json.load(f)
 
@@ -35,37 +227,198 @@ class IntentClassifier:
             for pattern in intent['patterns']:
                 patterns.append(pattern)
                 tags.append(intent['tag'])
+        return patterns, tags
 
-        processed_patterns = [self._preprocess(p) for p in patterns]
+    @staticmethod
+    def _fingerprint(tag, pattern):
+        return hashlib.sha1(f"{tag}\t{pattern}".encode('utf-8')).hexdigest()[:16]
 
+    def train(self, data_path):
+        """Training the intent classifier model"""
+        patterns, tags = self._load_training_data(data_path)
+
+        processed_patterns = self._preprocess_batch(patterns)
+
+        from sklearn.preprocessing import LabelEncoder
+
+        self.pipeline = self._new_pipeline()
+        self.label_encoder = LabelEncoder()
+        self.compact = None
         encoded_tags = self.label_encoder.fit_transform(tags)
 
-        self.pipeline.fit(processed_patterns, encoded_tags)
+        self._fit_pipeline(self.pipeline, processed_patterns, encoded_tags)
+        self.temperature = self._fit_temperature(processed_patterns, encoded_tags)
+        self.confidence_threshold = None
+        self.trained_patterns = {self._fingerprint(tag, pattern) for pattern, tag in zip(patterns, tags)}
+        self.model_version = next(_MODEL_VERSIONS)
         print("Training complete")
 
-    def predict(self, text):
-        """Predicting the intent of the given text"""
-        processed_text = self._preprocess(text)
-        prediction = self.pipeline.predict([processed_text])
+    def choose_confidence_threshold(self, holdout_path, recall=THRESHOLD_RECALL):
+        """
+        Picks the confidence threshold from held-out commands (training-data format): the
+        highest one, rounded down to a hundredth, that still accepts `recall` of the commands
+        the model gets right. Returns it, or None for an uncalibrated model or no holdout file.
+        """
+        if not self.calibrated or not os.path.exists(holdout_path):
+            return None
+        patterns, tags = self._load_training_data(holdout_path)
+        probabilities = self._probabilities(self._preprocess_batch(patterns))
+        all_tags = self._tags()
+        predicted = probabilities.argmax(axis=1)
+        correct = np.array([all_tags[i] == tag for i, tag in zip(predicted, tags)])
+        if not correct.any():
+            return None
+        confidences = np.sort(probabilities.max(axis=1)[correct])
+        rejected = int((1 - recall) * len(confidences))
+        self.confidence_threshold = float(np.floor(confidences[rejected] * 100) / 100)
+        return self.confidence_threshold
+
+    def update(self, data_path, epochs=SGD_EPOCHS):
+        """
+        Teaches a hashing model the patterns in data_path it hasn't been trained on,
+        with partial_fit instead of a full retrain. Returns how many patterns were new.
+        New intents still need train(): an SGD classifier's set of classes is fixed.
+        The confidence calibration is kept as it was.
+        """
+        if self.pipeline is None and self.compact is None:
+            raise ValueError("There is no model to update; train or load one first.")
+        if not self.incremental:
+            raise ValueError(f"This model uses the '{self.featurizer}' featurizer, which can't learn new patterns "
+                             f"without a full retrain; only 'hashing' models can be updated incrementally.")
+        patterns, tags = self._load_training_data(data_path)
+        unknown = set(tags) - set(self._tags())
+        if unknown:
+            raise ValueError(f"New intents {sorted(unknown)} need a full retrain.")
 
-        tag = self.label_encoder.inverse_transform(prediction)[0]
-        return tag
+        is_new = [self._fingerprint(tag, pattern) not in self.trained_patterns for pattern, tag in zip(patterns, tags)]
+        new = [i for i, flag in enumerate(is_new) if flag]
+        if not new:
+            print("No new patterns to learn.")
+            return 0
+        known = [i for i, flag in enumerate(is_new) if not flag]
+        rehearsal = []
+        if known:
+            rng = np.random.default_rng(len(self.trained_patterns))
+            rehearsal = rng.choice(known, size=min(len(known), REHEARSAL_RATIO * len(new)), replace=False).tolist()
+
+        rows = new + rehearsal
+        processed_patterns = self._preprocess_batch([patterns[i] for i in rows])
+        encoded_tags = self.label_encoder.transform([tags[i] for i in rows])
+        self._partial_fit(self.pipeline, processed_patterns, encoded_tags, epochs)
+        self.trained_patterns.update(self._fingerprint(tags[i], patterns[i]) for i in new)
+        self.model_version = next(_MODEL_VERSIONS)
+        print(f"Learnt {len(new)} new patterns (rehearsing {len(rehearsal)} known ones).")
+        return len(new)
+
+    @metrics.timed(metrics.STAGE_SECONDS, stage='intent')
+    def predict(self, text, doc=None):
+        """
+        Predicting the intent of the given text.
+        If the caller already parsed the text, passing its doc skips a second spaCy run.
+        """
+        processed_text = self._preprocess_doc(doc) if doc is not None else self._preprocess(text)
+        return self._predict_processed([processed_text])[0]
+
+    @metrics.timed(metrics.STAGE_SECONDS, stage='intent')
+    def predict_proba(self, text, doc=None):
+        """Returns a {tag: calibrated probability} dict for the given text."""
+        processed_text = self._preprocess_doc(doc) if doc is not None else self._preprocess(text)
+        return dict(zip(self._tags(), self._probabilities([processed_text])[0].tolist()))
+
+    @metrics.timed(metrics.STAGE_SECONDS, stage='intent')
+    def predict_top_k(self, text, k=3, doc=None):
+        """
+        Returns the k most likely (tag, probability) pairs, most likely first.
+        Text with none of the training vocabulary is certainly none of the trained
+        intents and gets [(NO_EVIDENCE_INTENT, 1.0)].
+        """
+        processed_text = self._preprocess_doc(doc) if doc is not None else self._preprocess(text)
+        probabilities, no_evidence = self._probabilities_and_evidence([processed_text])
+        if no_evidence[0]:
+            return [(self.NO_EVIDENCE_INTENT, 1.0)]
+        return sorted(zip(self._tags(), probabilities[0].tolist()), key=lambda item: item[1], reverse=True)[:k]
+
+    def predict_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+        """Predicting the intents of many texts with one tokenizer stream and one sklearn call."""
+        texts = list(texts)
+        if not texts:
+            return []
+        processed_texts = self._preprocess_batch(texts, batch_size=batch_size, n_process=n_process)
+        return self._predict_processed(processed_texts)
+
+    def predict_proba_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+        """Returns a {tag: probability} dict for each text, computed in one vectorized call."""
+        texts = list(texts)
+        if not texts:
+            return []
+        processed_texts = self._preprocess_batch(texts, batch_size=batch_size, n_process=n_process)
+        tags = self._tags()
+        return [dict(zip(tags, row)) for row in self._probabilities(processed_texts).tolist()]
 
     def save_model(self, model_path):
-        """Saving the trained pipeline and label encoder."""
+        """Saving the trained pipeline and label encoder, plus the compact export of both."""
+        import joblib
+
         if not os.path.exists(model_path):
             os.makedirs(model_path)
-        joblib.dump(self.pipeline, os.path.join(model_path, "intent_pipeline.joblib"))
-        joblib.dump(self.label_encoder, os.path.join(model_path, "label_encoder.joblib"))
+        joblib.dump(self.pipeline, os.path.join(model_path, PIPELINE_FILE))
+        joblib.dump(self.label_encoder, os.path.join(model_path, LABEL_ENCODER_FILE))
+        with open(os.path.join(model_path, CALIBRATION_FILE), 'w') as f:
+            json.dump({"temperature": self.temperature, "confidence_threshold": self.confidence_threshold}, f)
+        with open(os.path.join(model_path, TRAINED_PATTERNS_FILE), 'w') as f:
+            json.dump(sorted(self.trained_patterns), f)
+        try:
+            compact_model.export(self.pipeline, self._tags(), model_path)
+        except ValueError as e:
+            # Loading falls back to the joblib files.
+            print(f"Note: no compact export for this model ({e}).")
         print(f"Model saved to {model_path}")
 
-    def load_model(self, model_path):
-        """Loading a pre-trained model."""
+    def load_model(self, model_path, model_format="auto"):
+        """
+        Loading a pre-trained model. model_format is "compact" (memory-mapped NumPy arrays,
+        no sklearn), "joblib" (the pickled sklearn pipeline) or "auto": compact if it was exported.
+        """
         try:
-            self.pipeline = joblib.load(os.path.join(model_path, "intent_pipeline.joblib"))
-            self.label_encoder = joblib.load(os.path.join(model_path, "label_encoder.joblib"))
+            if model_format != "joblib" and compact_model.exists(model_path):
+                self.compact = compact_model.CompactIntentModel.load(model_path)
+                self.pipeline = self.label_encoder = None
+                self.featurizer = 'tfidf'
+            else:
+                if model_format == "compact":
+                    print("Warning: No compact intent model found, loading the joblib one. "
+                          "Re-run train_model.py to export it.")
+                import joblib
+
+                self.pipeline = joblib.load(os.path.join(model_path, PIPELINE_FILE))
+                self.label_encoder = joblib.load(os.path.join(model_path, LABEL_ENCODER_FILE))
+                self.compact = None
+                self.featurizer = 'hashing' if self.incremental else 'tfidf'
+            calibration = self._load_calibration(model_path)
+            self.temperature = calibration.get("temperature")
+            self.confidence_threshold = calibration.get("confidence_threshold")
+            self.trained_patterns = self._load_trained_patterns(model_path)
+            self.model_version = next(_MODEL_VERSIONS)
             print("Model loaded successfully.")
             return True
         except FileNotFoundError:
             print("Error: Model files not found. Please train the model first.")
-            return False
\ No newline at end of file
+            return False
+
+    @staticmethod
+    def _load_trained_patterns(model_path):
+        # Without the file every pattern looks new to update(), which is merely slower.
+        try:
+            with open(os.path.join(model_path, TRAINED_PATTERNS_FILE), 'r') as f:
+                return set(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return set()
+
+    @staticmethod
+    def _load_calibration(model_path):
+        # Models trained before calibration was added simply have no calibration file.
+        try:
+            with open(os.path.join(model_path, CALIBRATION_FILE), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
@@ -0,0 +1,134 @@
+import json
+import os
+import signal
+import threading
+import time
+
+
+def holdout_accuracy(classifier, holdout_path):
+    """The fraction of the held-out patterns (training-data format) the classifier gets right; None without a holdout file."""
+    try:
+        with open(holdout_path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    patterns = [pattern for intent in data['intents'] for pattern in intent['patterns']]
+    tags = [intent['tag'] for intent in data['intents'] for _ in intent['patterns']]
+    if not patterns:
+        return None
+    predictions = classifier.predict_batch(patterns)
+    return sum(predicted == tag for predicted, tag in zip(predictions, tags)) / len(patterns)
+
+
+def _fingerprint(directory):
+    try:
+        entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return ()
+    return tuple((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size) for entry in entries if entry.is_file())
+
+
+class ModelManager:
+    """
+    Keeps the model in a LazyResource up to date while JARVIS is running. reload()
+    builds a new model on a background thread, checks it against the held-out set
+    and only then swaps it in. Commands already being processed hold a reference to
+    the old model and finish with it; the next command gets the new one.
+    """
+
+    def __init__(self, resource, load, holdout_path, min_accuracy=0.85, max_regression=0.05):
+        self.resource = resource
+        self._load = load
+        self.holdout_path = holdout_path
+        # A new model is rejected below min_accuracy, or if it does more than
+        # max_regression worse than the model it would replace.
+        self.min_accuracy = min_accuracy
+        self.max_regression = max_regression
+        self.reloads = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._requested = False
+        self._thread = None
+
+    def reload(self):
+        """
+        Starts reloading in the background and returns the thread doing it. A request that
+        arrives while a reload is running makes it load once more afterwards, so files
+        written in the meantime aren't missed.
+        """
+        with self._lock:
+            self._requested = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="model-reload", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._requested:
+                    self._thread = None
+                    return
+                self._requested = False
+            self.reload_now()
+
+    def reload_now(self):
+        """Loads, validates and swaps in the model on the calling thread. Returns whether it was swapped in."""
+        start = time.perf_counter()
+        try:
+            candidate = self._load()
+        except Exception as e:
+            print(f"Model reload failed, keeping the current model: {e}")
+            return False
+        if candidate is None:
+            print("Model reload failed, keeping the current model.")
+            return False
+
+        accuracy = holdout_accuracy(candidate, self.holdout_path)
+        if accuracy is None:
+            print(f"Warning: No held-out set at {self.holdout_path}; the new model is not validated.")
+        else:
+            current = self.resource.get() if self.resource.loaded else None
+            baseline = holdout_accuracy(current, self.holdout_path) if current is not None else None
+            if accuracy < self.min_accuracy or (baseline is not None and accuracy < baseline - self.max_regression):
+                self.rejected += 1
+                print(f"Model reload rejected: held-out accuracy {accuracy:.2%}"
+                      + (f" against {baseline:.2%} for the current model." if baseline is not None else "."))
+                return False
+
+        self.resource.replace(candidate)
+        self.reloads += 1
+        validated = f", held-out accuracy {accuracy:.2%}" if accuracy is not None else ""
+        print(f"Model reloaded in {(time.perf_counter() - start) * 1000:.0f} ms{validated}.")
+        return True
+
+    def watch(self, directory, interval_seconds):
+        """
+        Polls directory on a daemon thread and reloads once its files have changed and
+        then stayed the same for a whole interval, so a model still being written by
+        train_model.py is never picked up half-way.
+        """
+        def run():
+            loaded = _fingerprint(directory)
+            changed = None
+            while True:
+                time.sleep(interval_seconds)
+                current = _fingerprint(directory)
+                if current == loaded:
+                    changed = None
+                elif current == changed:
+                    loaded = current
+                    self.reload()
+                else:
+                    changed = current
+        thread = threading.Thread(target=run, name="model-watch", daemon=True)
+        thread.start()
+        return thread
+
+    def reload_on_sighup(self):
+        """Makes SIGHUP (kill -HUP <pid>) trigger a reload, where the platform has it."""
+        if not hasattr(signal, 'SIGHUP') or threading.current_thread() is not threading.main_thread():
+            return False
+        # The handler runs on the main thread between bytecodes; it only hands off to a new thread.
+        signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(target=self.reload, daemon=True).start())
+        return True
@@ -1,89 +1,262 @@
-import spacy
+import ast
+import re
 
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    spacy.cli.download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+from jarvis_core.actions.math_ops import UNPARSEABLE_EXPRESSION
 
+# Spoken operators, by the Python operator they become.
+op_map = {
+    "plus": "+", "add": "+", "added to": "+",
+    "minus": "-", "subtract": "-", "less": "-", "take away": "-",
+    "times": "*", "multiplied by": "*", "x": "*",
+    "divided by": "/", "over": "/", "split by": "/",
+    "mod": "%", "modulo": "%", "modulus": "%",
+    "power": "**", "raised to": "**", "exponent": "**",
+    "to the power of": "**", "raised to the power of": "**", "to the": "**",
+}
+func_map = {
+    "square root": "sqrt", "sqrt": "sqrt", "root": "sqrt",
+    "cube root": "cbrt",
+    "log": "log10", "logarithm": "log10", "log base 10": "log10",
+    "natural log": "ln", "natural logarithm": "ln", "ln": "ln",
+    "sine": "sin", "sin": "sin",
+    "cosine": "cos", "cos": "cos",
+    "tangent": "tan", "tan": "tan",
+    "arcsine": "asin", "inverse sine": "asin", "inverse sin": "asin",
+    "arccosine": "acos", "inverse cosine": "acos", "inverse cos": "acos",
+    "arctangent": "atan", "inverse tangent": "atan", "inverse tan": "atan",
+    "absolute value": "abs", "abs": "abs",
+    "factorial": "factorial"
+}
+# Operators spoken before both operands: "add 5 and 7", "subtract 3 from 10".
+prefix_op_map = {
+    "add": "+", "sum of": "+",
+    "subtract": "-", "difference between": "-",
+    "multiply": "*", "product of": "*",
+    "divide": "/",
+}
+constant_map = {"pi": "pi", "e": "e"}
+number_words = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90,
+}
+number_scales = {"hundred": 100, "thousand": 1000, "million": 1000000}
+trig_funcs = {"sin", "cos", "tan"}
+inv_trig_funcs = {"asin", "acos", "atan"}
 
-def parse_math_query(text):
+_SYMBOLS = {"+": "+", "-": "-", "*": "*", "×": "*", "/": "/", "÷": "/", "^": "**", "%": "%", "(": "(", ")": ")"}
+_BINARY_OPS = {"+": ast.Add, "-": ast.Sub, "*": ast.Mult, "/": ast.Div, "%": ast.Mod, "**": ast.Pow}
+
+
+def _phrase_pattern(phrases):
+    # Longest phrases first, so "square root" wins over "root" and "raised to the power of" over "raised to".
+    ordered = sorted(phrases, key=len, reverse=True)
+    return "|".join(r"\s+".join(re.escape(word) for word in phrase.split()) for phrase in ordered)
+
+
+_NUMBER_WORD = _phrase_pattern(list(number_words) + list(number_scales))
+_UNIT_WORD = _phrase_pattern(number_words)
+# "five hundred and twenty": 'and' continues a number only right after a scale word, and
+# only into units and tens, so "add five and seven" and "one hundred and two hundred" stay apart.
+_SCALE_AND = "(?:" + "|".join(f"(?<={scale})" for scale in number_scales) + r")\s+and\s+"
+
+# One pass over the lowercased query produces every token; the alternatives are tried
+# in order, so numbers and known phrases win over the catch-all filler word.
+_TOKEN_RE = re.compile(
+    rf"(?P<percent>(?:%|\bpercent\b)\s+of\b)"
+    rf"|(?P<number>(?:\d{{1,3}}(?:,\d{{3}})+|\d+)(?:\.\d+)?|\.\d+)(?:st|nd|rd|th)?(?:\s+power\b)?"
+    rf"|\b(?P<words>(?:{_NUMBER_WORD})(?:[\s-]+(?:{_NUMBER_WORD}))*(?:{_SCALE_AND}(?:{_UNIT_WORD})(?:[\s-]+(?:{_UNIT_WORD}))*)?)\b"
+    rf"|\b(?P<prefix>{_phrase_pattern(prefix_op_map)})\b(?=.*\b(?:and|by|from)\b)"
+    rf"|\b(?P<function>{_phrase_pattern(func_map)})\b"
+    rf"|\b(?P<operator>{_phrase_pattern(op_map)})\b"
+    rf"|\b(?P<constant>{_phrase_pattern(constant_map)})\b"
+    rf"|\b(?P<connector>and|by|from)\b"
+    rf"|(?P<symbol>[-+*×/÷^%()])"
+    rf"|(?P<filler>\w+)"
+)
+
+
+def _words_to_number(words):
+    total, current = 0, 0
+    for word in re.split(r"[\s-]+", words):
+        if word == "and":
+            continue
+        if word in number_scales:
+            current = max(current, 1) * number_scales[word]
+            if number_scales[word] >= 1000:
+                total, current = total + current, 0
+        else:
+            current += number_words[word]
+    return total + current
+
+
+def tokenize(text):
     """
-    A more robust, token-based parser for math queries.
+    Splits a spoken math query into (kind, value) tokens in a single regex pass.
+    Filler words ("what", "is", "the", "of", "degrees", ...) are dropped.
     """
-    op_map = {
-        "plus": "+", "add": "+",
-        "minus": "-", "subtract": "-", "less": "-",
-        "times": "*", "multiplied by": "*", "x": "*",
-        "divided by": "/", "over": "/",
-        "power": "**", "raised to": "**"
-    }
-    func_map = {
-        "square root": "sqrt", "sqrt": "sqrt",
-        "cube root": "cbrt",
-        "log": "log10", "logarithm": "log10",
-        "natural log": "ln", "ln": "ln",
-        "sine": "sin", "sin": "sin",
-        "cosine": "cos", "cos": "cos",
-        "tangent": "tan", "tan": "tan",
-        "arcsine": "asin", "inverse sine": "asin",
-        "arccosine": "acos", "inverse cosine": "acos",
-        "arctangent": "atan", "inverse tangent": "atan",
-        "factorial": "factorial"
-    }
-    trig_funcs = {"sin", "cos", "tan"}
-    inv_trig_funcs = {"asin", "acos", "atan"}
-
-    doc = nlp(text.lower())
-    parts = []
-    i = 0
-    while i < len(doc):
-        token = doc[i]
-
-        # To handle numbers
-        if token.like_num:
-            parts.append(token.text)
-        # To handle operators
-        elif token.text in op_map:
-            parts.append(op_map[token.text])
-        # To handle multi-word functions like "square root"
-        elif i + 1 < len(doc) and f"{token.text} {doc[i + 1].text}" in func_map:
-            func = func_map[f"{token.text} {doc[i + 1].text}"]
-            parts.append(func + "(")
-            i += 1  # Skip next token
-        # To handle single-word functions
-        elif token.text in func_map:
-            func = func_map[token.text]
-            parts.append(func + "(")
-
-        i += 1
-
-    # Simple logic to balance parentheses
-    expression = " ".join(parts)
-    open_paren = expression.count('(')
-    close_paren = expression.count(')')
-    if open_paren > close_paren:
-        expression += ' )' * (open_paren - close_paren)
-
-    # Special handling for trig degrees
-    final_expr = []
-    tokens = expression.split()
-    skip_next = False
-    for i, token in enumerate(tokens):
-        if skip_next:
-            skip_next = False
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "filler":
             continue
-
-        # Checking if a trig function needs radians() wrapper
-        func_name = token.replace('(', '')
-        if func_name in trig_funcs and i + 1 < len(tokens):
-            final_expr.append(f"{func_name}(radians({tokens[i + 1]}))")
-            skip_next = True  # Skip the number token as we've consumed it
-        # Checking if an inverse trig function needs degrees() wrapper
-        elif func_name in inv_trig_funcs and i + 1 < len(tokens):
-            final_expr.append(f"degrees({func_name}({tokens[i + 1]}))")
-            skip_next = True
+        if kind == "number":
+            number = value.replace(",", "")
+            tokens.append(("number", float(number) if "." in number else int(number)))
+        elif kind == "words":
+            tokens.append(("number", _words_to_number(value)))
+        elif kind == "percent":
+            tokens.append(("percent", "%"))
+        elif kind == "prefix":
+            tokens.append(("prefix", prefix_op_map[" ".join(value.split())]))
+        elif kind == "function":
+            tokens.append(("function", func_map[" ".join(value.split())]))
+        elif kind == "operator":
+            tokens.append(("operator", op_map[" ".join(value.split())]))
+        elif kind == "constant":
+            tokens.append(("constant", constant_map[value]))
+        elif kind == "connector":
+            tokens.append(("connector", value))
         else:
-            final_expr.append(token)
+            symbol = _SYMBOLS[value]
+            tokens.append(("paren" if symbol in "()" else "operator", symbol))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive-descent parser over the token list, building a Python AST:
+        expression := term (('+' | '-') term)*
+        term       := power (('*' | '/' | '%' | 'percent of') power)*
+        power      := unary ('**' power)?
+        unary      := '-' unary | '+' unary | postfix
+        postfix    := primary 'factorial'*
+        primary    := number | constant | function unary | prefix expression (connector expression)+
+                    | '(' expression ')'
+    A prefix operator takes further operands with the same connector, left to right:
+    "add 5 and 7 and 8", "divide 100 by 5 by 2". "from" takes exactly one.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
 
-    return " ".join(final_expr).replace(" )", ")")
\ No newline at end of file
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.expression()
+        if self.position != len(self.tokens):
+            raise SyntaxError("unexpected trailing tokens")
+        return ast.Expression(body=node)
+
+    def _binary_level(self, operand, operators):
+        node = operand()
+        while True:
+            kind, value = self.peek()
+            if kind == "operator" and value in operators:
+                self.take()
+                node = ast.BinOp(left=node, op=_BINARY_OPS[value](), right=operand())
+            elif kind == "percent" and "%" in operators:
+                # "25 percent of 200" -> 25 / 100 * 200
+                self.take()
+                percent = ast.BinOp(left=node, op=ast.Div(), right=ast.Constant(100))
+                node = ast.BinOp(left=percent, op=ast.Mult(), right=operand())
+            else:
+                return node
+
+    def expression(self):
+        return self._binary_level(self.term, {"+", "-"})
+
+    def term(self):
+        return self._binary_level(self.power, {"*", "/", "%"})
+
+    def power(self):
+        base = self.unary()
+        if self.peek() == ("operator", "**"):
+            self.take()
+            return ast.BinOp(left=base, op=ast.Pow(), right=self.power())
+        return base
+
+    def unary(self):
+        kind, value = self.peek()
+        if kind == "operator" and value in ("-", "+"):
+            self.take()
+            op = ast.USub() if value == "-" else ast.UAdd()
+            return ast.UnaryOp(op=op, operand=self.unary())
+        return self.postfix()
+
+    def postfix(self):
+        node = self.primary()
+        # "7 factorial"
+        while self.peek() == ("function", "factorial"):
+            self.take()
+            node = _call("factorial", node)
+        return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "number":
+            return ast.Constant(value)
+        if kind == "constant":
+            return ast.Name(id=value, ctx=ast.Load())
+        if kind == "function":
+            argument = self.unary()
+            if value in trig_funcs:
+                return _call(value, _call("radians", argument))
+            if value in inv_trig_funcs:
+                return _call("degrees", _call(value, argument))
+            return _call(value, argument)
+        if kind == "prefix":
+            first = self.expression()
+            connector_kind, connector = self.take()
+            if connector_kind != "connector":
+                raise SyntaxError("expected 'and', 'by' or 'from'")
+            second = self.expression()
+            if connector == "from":
+                # "subtract 3 from 10" means 10 - 3
+                return ast.BinOp(left=second, op=_BINARY_OPS[value](), right=first)
+            node = ast.BinOp(left=first, op=_BINARY_OPS[value](), right=second)
+            while self.peek() == ("connector", connector):
+                self.take()
+                node = ast.BinOp(left=node, op=_BINARY_OPS[value](), right=self.expression())
+            return node
+        if (kind, value) == ("paren", "("):
+            node = self.expression()
+            if self.take() != ("paren", ")"):
+                raise SyntaxError("missing closing parenthesis")
+            return node
+        raise SyntaxError(f"unexpected token {value!r}")
+
+
+def _call(name, argument):
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=[argument], keywords=[])
+
+
+def parse_math_ast(text):
+    """Parses a spoken math query straight into a Python expression AST."""
+    return ast.fix_missing_locations(_Parser(tokenize(text)).parse())
+
+
+def parse_math_query(text):
+    """
+    Turns a spoken math query into an expression string for math_ops.evaluate_expression,
+    e.g. "what is the sine of 30 degrees" -> "sin(radians(30))".
+    A query that can't be parsed gives UNPARSEABLE_EXPRESSION, which the evaluator
+    answers with its format-problem message.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return ""
+    try:
+        return ast.unparse(_Parser(tokens).parse())
+    except (SyntaxError, RecursionError):  # RecursionError: absurdly deep nesting
+        return UNPARSEABLE_EXPRESSION
@@ -0,0 +1,72 @@
+import copy
+import threading
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """
+    Collapses whitespace so that trivially different transcripts share a cache entry.
+    Case is kept because spaCy's NER is case-sensitive.
+    """
+    return " ".join(text.split())
+
+
+class NLPResultCache:
+    """
+    A bounded LRU cache of process_text_ml results with hit/miss counters.
+    Entries are keyed on (model version, normalized text); when a different
+    model version shows up, everything cached for the old one is dropped.
+    Only the NLP result is cached, the action for the intent still runs every time.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._model_version = None
+        self._lock = threading.Lock()
+
+    def _sync_version(self, model_version):
+        if model_version != self._model_version:
+            self._entries.clear()
+            self._model_version = model_version
+
+    def get(self, model_version, text):
+        key = normalize_text(text)
+        with self._lock:
+            self._sync_version(model_version)
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers are free to modify what they get back without corrupting the cache.
+        return copy.deepcopy(result)
+
+    def put(self, model_version, text, result):
+        if self.max_size <= 0:
+            return
+        key = normalize_text(text)
+        with self._lock:
+            self._sync_version(model_version)
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -1,16 +1,79 @@
-import spacy
-from jarvis_core.ml.intent_classifier import IntentClassifier
+import logging
+import threading
 
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Downloading spaCy model...")
-    spacy.cli.download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+from jarvis_core.ml.model_manager import ModelManager
+from jarvis_core.nlp.cache import NLPResultCache
+from jarvis_core.nlp.registry import get_nlp
+from jarvis_core.nlp.utterance import Utterance
+from jarvis_core.utils import config_loader, metrics
+from jarvis_core.utils.startup import LazyResource
+from ._math_parser import parse_math_query
 
-INTENT_CLASSIFIER = IntentClassifier()
-MODEL_LOADED = INTENT_CLASSIFIER.load_model('jarvis_core/ml/model')
+logger = logging.getLogger(__name__)
 
+MODEL_PATH = 'jarvis_core/ml/model'
+# Labelled commands the model was not trained on; a reloaded model must do well enough on them.
+HOLDOUT_PATH = 'config/holdout_data.json'
+
+SETTINGS = config_loader.load_settings()
+# Below this calibrated probability the prediction is treated as noise and no action is run.
+# None (the default) uses the threshold train_model.py chose on the held-out commands,
+# or DEFAULT_CONFIDENCE_THRESHOLD for a model trained before it did.
+CONFIDENCE_THRESHOLD = SETTINGS.get('intent_confidence_threshold')
+DEFAULT_CONFIDENCE_THRESHOLD = 0.6
+# Either 'unknown' (just say so) or 'clarify' (ask which of the top candidates was meant).
+LOW_CONFIDENCE_INTENT = SETTINGS.get('low_confidence_intent', 'unknown')
+TOP_K_INTENTS = 3
+# 'compact' (memory-mapped NumPy export, no sklearn at runtime), 'joblib', or 'auto' (compact if present).
+MODEL_FORMAT = SETTINGS.get('intent_model_format', 'auto')
+
+# Users repeat the same handful of commands, so their NLP results are kept around.
+NLP_CACHE = NLPResultCache(SETTINGS.get('nlp_cache_size', 256))
+
+# A partial transcript whose intent is at least this likely starts that intent's prewarm.
+SPECULATION_THRESHOLD = SETTINGS.get('speculation_confidence_threshold', 0.7)
+# intent -> handler(entities, cancelled) that gets the action ready before the user has
+# finished speaking; cancelled is a threading.Event. Filled in by whoever owns the actions.
+PREWARM_HANDLERS = {}
+
+
+def _load_intent_classifier():
+    # Deferred so that importing the processor does not drag in sklearn and joblib.
+    from jarvis_core.ml.intent_classifier import IntentClassifier
+
+    classifier = IntentClassifier()
+    if not classifier.load_model(MODEL_PATH, MODEL_FORMAT):
+        return None
+    if not classifier.calibrated:
+        logger.warning("The intent model has no confidence calibration, so low-confidence commands "
+                       "will not be filtered. Re-run train_model.py to enable it.")
+    return classifier
+
+
+NLP = LazyResource("spacy_nlp", get_nlp)
+
+# Pipeline components extract_entities needs for each intent. Intents not listed
+# only look at the raw text, so they never pay for the tagger, parser or NER.
+ENTITY_COMPONENTS = {
+    'get_weather': ('ner',),
+    'set_volume': ('ner',),
+    'search_wikipedia': ('ner', 'tagger', 'attribute_ruler', 'parser'),
+}
+INTENT_CLASSIFIER = LazyResource("intent_model", _load_intent_classifier)
+# Swaps a retrained model into INTENT_CLASSIFIER without restarting. Cached NLP results
+# are keyed on the model version, so they go stale with the old model.
+MODEL_MANAGER = ModelManager(INTENT_CLASSIFIER, _load_intent_classifier, HOLDOUT_PATH,
+                             min_accuracy=SETTINGS.get('model_min_holdout_accuracy', 0.85))
+
+
+def start_model_reloading():
+    """Reloads the intent model on SIGHUP and, if configured, whenever train_model.py rewrites it."""
+    MODEL_MANAGER.reload_on_sighup()
+    interval = SETTINGS.get('model_watch_interval_seconds', 5)
+    if interval:
+        MODEL_MANAGER.watch(MODEL_PATH, interval)
+
+@metrics.timed(metrics.STAGE_SECONDS, stage='entities')
 def extract_entities(doc, intent):
     """
     Extracts entities based on the predicted intent.
@@ -63,24 +126,142 @@ def extract_entities(doc, intent):
 def process_text_ml(text):
     """
     Processes text using a trained ML model for intent and spaCy for entities.
+    Results are cached per normalized text and model version; the caller still
+    runs the action fresh every time.
     """
-    if not MODEL_LOADED:
+    classifier = INTENT_CLASSIFIER.get()
+    if classifier is None:
         return {'intent': 'model_error', 'entities': {}}
 
-    # 1. Predicting the intent using our ML model
-    intent = INTENT_CLASSIFIER.predict(text)
+    cached = NLP_CACHE.get(classifier.model_version, text)
+    if cached is not None:
+        return cached
+
+    result = _analyze_text(classifier, text)
+    NLP_CACHE.put(classifier.model_version, text, result)
+    return result
+
+
+def _confidence_threshold(classifier):
+    if CONFIDENCE_THRESHOLD is not None:
+        return CONFIDENCE_THRESHOLD
+    if classifier.confidence_threshold is not None:
+        return classifier.confidence_threshold
+    return DEFAULT_CONFIDENCE_THRESHOLD
+
+
+def _analyze_text(classifier, text):
+    # 1. Tokenizing the text once; every step below shares the same Doc
+    utterance = Utterance(text)
+
+    # 2. Predicting the intent using our ML model, keeping the runners-up and their confidence
+    candidates = classifier.predict_top_k(text, k=TOP_K_INTENTS, doc=utterance.ensure(classifier.NLP_COMPONENTS))
+    intent, confidence = candidates[0]
 
-    # 2. Using spaCy to process the text for entity extraction
-    doc = nlp(text)
+    # Nothing in the text was seen in training; calibrated or not, no intent's action runs.
+    if intent == classifier.NO_EVIDENCE_INTENT:
+        logger.debug("Text=%r, no known words, routing to %r", text, intent)
+        return {'intent': intent, 'entities': {}, 'confidence': confidence, 'candidates': candidates}
 
-    # 3. Extracting entities based on the predicted intent
+    # Misheard noise should not trigger a web search or a Wikipedia lookup.
+    if classifier.calibrated and confidence < _confidence_threshold(classifier):
+        entities = {'candidates': [tag for tag, _ in candidates]} if LOW_CONFIDENCE_INTENT == 'clarify' else {}
+        logger.debug("Text=%r, low confidence %.2f for %r, routing to %r",
+                     text, confidence, intent, LOW_CONFIDENCE_INTENT)
+        return {'intent': LOW_CONFIDENCE_INTENT, 'entities': entities,
+                'confidence': confidence, 'candidates': candidates}
+
+    # 3. Extracting entities, running only the components this intent needs
+    doc = utterance.ensure(ENTITY_COMPONENTS.get(intent, ()))
     entities = extract_entities(doc, intent)
 
     # Special case: calculation. The whole text is the expression.
     if intent == 'calculate':
+        with metrics.timer(metrics.STAGE_SECONDS, stage='math_parse'):
+            entities['expression'] = parse_math_query(text)
+
+    logger.debug("Text=%r, Intent=%r, Confidence=%.2f, Entities=%r", text, intent, confidence, entities)
+    return {'intent': intent, 'entities': entities, 'confidence': confidence, 'candidates': candidates}
+
+
+class Speculation:
+    """A prewarm started from a partial transcript, on its own daemon thread."""
+
+    def __init__(self, intent, entities, handler):
+        self.intent = intent
+        self.entities = entities
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(handler,), name=f"prewarm-{intent}", daemon=True)
+
+    def _run(self, handler):
+        if self.cancelled.is_set():
+            return
+        try:
+            handler(self.entities, self.cancelled)
+        except Exception as e:
+            logger.warning("Prewarm for %r failed: %s", self.intent, e)
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+_speculation = None
+# The (intent, entities) the previous partial pointed at; a prewarm only starts once two
+# partials in a row agree, so "weather in par" doesn't prefetch before "weather in paris".
+_candidate = None
+_speculation_lock = threading.Lock()
+
+
+def _cancel_speculation():
+    global _speculation, _candidate
+    with _speculation_lock:
+        speculation, _speculation, _candidate = _speculation, None, None
+    if speculation is not None:
+        speculation.cancel()
+
+
+def speculate(partial_text):
+    """
+    Classifies a partial transcript and, once consecutive partials confidently agree on an
+    intent that has a prewarm handler (and on its entities), starts that prewarm. A later
+    partial that points elsewhere, or nowhere, cancels it. Returns the speculated intent, or None.
+    """
+    global _speculation, _candidate
+    # Never block the capture thread on loading the model.
+    classifier = INTENT_CLASSIFIER.get() if INTENT_CLASSIFIER.loaded else None
+    if classifier is None or not classifier.calibrated or len(partial_text.split()) < 2:
+        return None
+
+    utterance = Utterance(partial_text)
+    intent, confidence = classifier.predict_top_k(partial_text, k=1, doc=utterance.ensure(classifier.NLP_COMPONENTS))[0]
+    handler = PREWARM_HANDLERS.get(intent)
+    if handler is None or confidence < SPECULATION_THRESHOLD:
+        _cancel_speculation()
+        return None
+    entities = extract_entities(utterance.ensure(ENTITY_COMPONENTS.get(intent, ())), intent)
+
+    with _speculation_lock:
+        if _speculation is not None:
+            if (_speculation.intent, _speculation.entities) == (intent, entities):
+                return intent
+            _speculation.cancel()
+            _speculation = None
+        if _candidate != (intent, entities):
+            _candidate = (intent, entities)
+            return None
+        _speculation = Speculation(intent, entities, handler)
+        _speculation.thread.start()
+    return intent
 
-        from ._math_parser import parse_math_query  # We will create this helper file
-        entities['expression'] = parse_math_query(text)
 
-    print(f"ML NLP Debug: Text='{text}', Intent='{intent}', Entities='{entities}'")
-    return {'intent': intent, 'entities': entities}
\ No newline at end of file
+def settle_speculation(final_intent):
+    """Called with the intent of the finished utterance; cancels speculative work for any other intent."""
+    global _speculation, _candidate
+    with _speculation_lock:
+        speculation, _speculation, _candidate = _speculation, None, None
+    if speculation is None:
+        return False
+    if speculation.intent != final_intent:
+        speculation.cancel()
+        return False
+    return True
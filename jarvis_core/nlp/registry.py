@@ -0,0 +1,70 @@
+import threading
+
+from jarvis_core.utils import startup
+
+DEFAULT_MODEL = "en_core_web_sm"
+
+_MODELS = {}
+_RESOLVED_COMPONENTS = {}
+_LOCK = threading.Lock()
+
+
+def _load(name):
+    # spaCy itself takes about a second to import, so it is only pulled in with the first model.
+    with startup.timed("spacy", "import"):
+        import spacy
+    try:
+        return spacy.load(name)
+    except OSError:
+        print("Downloading spaCy model...")
+        spacy.cli.download(name)
+        return spacy.load(name)
+
+
+def get_nlp(name=DEFAULT_MODEL):
+    """
+    Returns the shared spaCy pipeline for the given model name.
+    The model is loaded the first time it is asked for and reused afterwards,
+    so every part of JARVIS works on the same copy.
+    """
+    nlp = _MODELS.get(name)
+    if nlp is None:
+        with _LOCK:
+            nlp = _MODELS.get(name)
+            if nlp is None:
+                nlp = _load(name)
+                _MODELS[name] = nlp
+    return nlp
+
+
+def make_doc(text, name=DEFAULT_MODEL):
+    """Tokenizer-only fast path: no tagger, parser, NER or lemmatizer is run."""
+    return get_nlp(name).make_doc(text)
+
+
+def resolve_components(components, name=DEFAULT_MODEL):
+    """
+    Works out which pipeline components must run, in pipeline order, to provide
+    the requested ones. A shared tok2vec is pulled in only when one of the
+    requested components listens to it.
+    """
+    key = (name, frozenset(components))
+    resolved = _RESOLVED_COMPONENTS.get(key)
+    if resolved is None:
+        nlp = get_nlp(name)
+        needed = set(components) & set(nlp.pipe_names)
+        for pipe_name, pipe in nlp.pipeline:
+            listeners = getattr(pipe, "listening_components", None) or []
+            if needed.intersection(listeners):
+                needed.add(pipe_name)
+        resolved = tuple(pipe_name for pipe_name in nlp.pipe_names if pipe_name in needed)
+        _RESOLVED_COMPONENTS[key] = resolved
+    return resolved
+
+
+def apply_components(doc, components, name=DEFAULT_MODEL):
+    """Runs only the given components (already resolved and ordered) over an existing doc."""
+    nlp = get_nlp(name)
+    for pipe_name in components:
+        doc = nlp.get_pipe(pipe_name)(doc)
+    return doc
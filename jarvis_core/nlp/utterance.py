@@ -0,0 +1,33 @@
+from jarvis_core.nlp import registry
+
+
+class Utterance:
+    """
+    Everything JARVIS knows about one spoken command.
+    The text is tokenized once and the same Doc is handed to the intent
+    classifier, the entity extractor and the math parser. Statistical
+    components (tagger, parser, NER) are only run when a consumer asks for
+    them through ensure(), and each of them runs at most once.
+    """
+
+    def __init__(self, text, model_name=registry.DEFAULT_MODEL):
+        self.text = text
+        self.model_name = model_name
+        self._doc = None
+        self._applied = set()
+
+    @property
+    def doc(self):
+        if self._doc is None:
+            self._doc = registry.make_doc(self.text, self.model_name)
+        return self._doc
+
+    def ensure(self, components):
+        """Makes sure the given pipeline components have annotated the doc, then returns it."""
+        doc = self.doc
+        missing = [name for name in registry.resolve_components(components, self.model_name)
+                   if name not in self._applied]
+        if missing:
+            self._doc = registry.apply_components(doc, missing, self.model_name)
+            self._applied.update(missing)
+        return self._doc
@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+
+
+class StageStats:
+    """Running latency figures for one pipeline stage, plus the depth of the queue feeding it."""
+
+    def __init__(self, name, inbox=None):
+        self.name = name
+        self.inbox = inbox
+        self.processed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.processed += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.last_seconds = seconds
+
+    def timed(self, fn):
+        """Wraps fn so that every call is recorded against this stage."""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(time.perf_counter() - start)
+        return wrapper
+
+    def snapshot(self):
+        with self._lock:
+            mean = self.total_seconds / self.processed if self.processed else 0.0
+            return {
+                'stage': self.name,
+                'depth': self.inbox.qsize() if self.inbox is not None else 0,
+                'processed': self.processed,
+                'mean_ms': mean * 1000,
+                'max_ms': self.max_seconds * 1000,
+                'last_ms': self.last_seconds * 1000,
+            }
+
+
+class Stage:
+    """
+    One worker thread of the pipeline. It takes items from inbox (or, for the first
+    stage, from a source iterable), passes each to handler, and puts any non-None
+    result on outbox. Queues are bounded, so a full outbox blocks the stage: a slow
+    stage holds back the ones before it instead of letting work pile up.
+    """
+
+    def __init__(self, name, handler=None, inbox=None, outbox=None, source=None):
+        self.name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.source = source
+        self.stats = StageStats(name, inbox)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        target = self._run_source if self.source is not None else self._run
+        self._thread = threading.Thread(target=target, name=f"stage-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_source(self):
+        start = time.perf_counter()
+        for item in self.source:
+            if self._stop.is_set():
+                return
+            if item is not None:
+                self.stats.record(time.perf_counter() - start)
+                self._emit(item)
+            start = time.perf_counter()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                item = self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                print(f"Error in pipeline stage '{self.name}': {e}")
+                result = None
+            self.stats.record(time.perf_counter() - start)
+            if result is not None:
+                self._emit(result)
+
+    def _emit(self, item):
+        if self.outbox is None:
+            return
+        while not self._stop.is_set():
+            try:
+                self.outbox.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+class Pipeline:
+    """The stages of one running assistant, started and stopped together."""
+
+    def __init__(self, stages=None):
+        self.stages = list(stages or [])
+        self.extra_stats = []
+
+    def add(self, stage):
+        self.stages.append(stage)
+        return stage
+
+    def track(self, name, inbox=None):
+        """Stats for work that doesn't run on a Stage thread (the action pool, the TTS loop)."""
+        stats = StageStats(name, inbox)
+        self.extra_stats.append(stats)
+        return stats
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+
+    def stats(self):
+        return [stage.stats.snapshot() for stage in self.stages] + [s.snapshot() for s in self.extra_stats]
+
+    def report(self):
+        lines = ["--- Pipeline stages ---",
+                 f"{'stage':<12}{'depth':>6}{'done':>7}{'mean ms':>10}{'max ms':>10}{'last ms':>10}"]
+        for s in self.stats():
+            lines.append(f"{s['stage']:<12}{s['depth']:>6}{s['processed']:>7}"
+                         f"{s['mean_ms']:>10.1f}{s['max_ms']:>10.1f}{s['last_ms']:>10.1f}")
+        return "\n".join(lines)
+
@@ -1,52 +1,521 @@
+import array
+import collections
+import json
+import logging
+import math
+import os
+import threading
+import time
+
 import speech_recognition as sr
+from jarvis_core import wake_word
+from jarvis_core.utils import config_loader, metrics
+from jarvis_core.utils.startup import LazyResource
 
-recognizer  = None
+logger = logging.getLogger(__name__)
 
-def init_stt():
-    global recognizer
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("STT: Calibrating for ambient noise, please wait...")
-        try:
-            recognizer.adjust_for_ambient_noise(source, duration=1)
-            print("STT: Calibration complete.")
-        except Exception as e:
-            print(f"STT Error during calibration: {e}")
+SETTINGS = config_loader.load_settings()
+# Backends that can decode while the user is still talking report partial transcripts.
+STREAMING = SETTINGS.get('stt_streaming', True)
+# When set, only speech after this word is captured and recognized. Needs a Vosk model
+# to spot it in microphone audio; replayed transcripts are matched as text.
+WAKE_WORD = SETTINGS.get('wake_word', '')
 
-def listen_for_command():
-    global recognizer
-    if not recognizer:
-        print("STT recognizer not initialized. Call init_stt() first.")
+# Phrase segmentation, in seconds; the same defaults listen_for_command always used.
+PAUSE_THRESHOLD = 1
+LISTEN_TIMEOUT = 5
+PHRASE_TIME_LIMIT = 10
+# How much audio the ring buffer keeps, and how much of it is prepended to a phrase
+# so its first syllable isn't clipped.
+RING_BUFFER_SECONDS = 15
+PRE_ROLL_SECONDS = 0.3
+# While JARVIS is talking the microphone hears it too, so cutting in (barge-in) takes
+# speech this many times louder than the threshold, for at least BARGE_IN_SECONDS.
+BARGE_IN_ENERGY_RATIO = 3
+BARGE_IN_SECONDS = 0.25
+# The energy threshold follows the ambient noise, re-estimated after this much audio.
+CALIBRATION_SECONDS = 1
+RECALIBRATE_EVERY_SECONDS = 5
+# Ambient level = this percentile of chunk energies in the window; speech seldom fills
+# most of a window, so the quiet end of it is the background noise.
+AMBIENT_PERCENTILE = 0.2
+
+
+def _rms(chunk):
+    samples = array.array('h', chunk)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class MicrophoneStream:
+    """
+    Keeps the audio device open for the whole session. A reader thread copies every
+    chunk into a ring buffer and re-estimates the ambient noise level from the recent
+    chunk energies in the background. listen() cuts phrases out
+    of that continuous stream with the same energy/pause rules as sr.Recognizer.listen.
+    """
+
+    def __init__(self, source_factory=sr.Microphone, energy_ratio=1.5, damping=0.15):
+        self._source_factory = source_factory
+        self.energy_ratio = energy_ratio
+        self.damping = damping
+        self.energy_threshold = 300
+        self.source = None
+        self._chunks = None
+        self._next_seq = 0
+        self._ambient = []
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self.source = self._source_factory().__enter__()
+        self.seconds_per_chunk = self.source.CHUNK / self.source.SAMPLE_RATE
+        self._chunks = collections.deque(maxlen=int(RING_BUFFER_SECONDS / self.seconds_per_chunk))
+        self._calibrate_initial()
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name="stt-microphone", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+        if self.source is not None:
+            self.source.__exit__(None, None, None)
+            self.source = None
+
+    def _read_chunk(self):
+        return self.source.stream.read(self.source.CHUNK)
+
+    def _calibrate_initial(self):
+        logger.info("Calibrating for ambient noise, please wait...")
+        levels = [_rms(self._read_chunk()) for _ in range(max(1, int(CALIBRATION_SECONDS / self.seconds_per_chunk)))]
+        self.energy_threshold = max(sum(levels) / len(levels) * self.energy_ratio, 1)
+        logger.info("Calibration complete.")
+
+    def _recalibrate(self):
+        levels = sorted(self._ambient)
+        self._ambient = []
+        target = max(levels[int(len(levels) * AMBIENT_PERCENTILE)] * self.energy_ratio, 1)
+        # Move part of the way towards the new estimate, so one noisy window can't swing it.
+        self.energy_threshold = self.energy_threshold * self.damping + target * (1 - self.damping)
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                chunk = self._read_chunk()
+            except Exception as e:
+                logger.warning("Error reading from the microphone: %s", e)
+                time.sleep(0.1)
+                continue
+            energy = _rms(chunk)
+            self._ambient.append(energy)
+            if len(self._ambient) * self.seconds_per_chunk >= RECALIBRATE_EVERY_SECONDS:
+                self._recalibrate()
+            with self._condition:
+                self._chunks.append((self._next_seq, chunk, energy))
+                self._next_seq += 1
+                self._condition.notify_all()
+
+    def _chunks_from(self, seq):
+        """Blocks until chunks newer than seq exist and returns them; skips ahead if they were overwritten."""
+        with self._condition:
+            while self._next_seq <= seq and self._running:
+                self._condition.wait(timeout=0.5)
+            oldest = self._chunks[0][0] if self._chunks else self._next_seq
+            return [c for c in self._chunks if c[0] >= max(seq, oldest)]
+
+    def wait_for_wake_word(self, detector, timeout=LISTEN_TIMEOUT):
+        """
+        Feeds the stream's frames to detector until it fires. Returns the position just
+        after the wake word (pass it to listen), or None after timeout seconds without it.
+        """
+        with self._condition:
+            seq = self._next_seq
+        waited = 0.0
+        while self._running:
+            for chunk_seq, chunk, energy in self._chunks_from(seq):
+                seq = chunk_seq + 1
+                if detector.feed(chunk, energy > self.energy_threshold):
+                    return seq
+                waited += self.seconds_per_chunk
+                if timeout and waited > timeout:
+                    return None
         return None
 
-    with sr.Microphone() as source:
-        print("\nListening for your command...")
+    def wait_for_barge_in(self, still_speaking):
+        """
+        Watches the stream while still_speaking() is true. Returns True as soon as the user
+        talks over it (loud enough for long enough), False once the speech has ended.
+        """
+        with self._condition:
+            seq = self._next_seq
+        needed = max(1, math.ceil(BARGE_IN_SECONDS / self.seconds_per_chunk))
+        loud_run = 0
+        while self._running and still_speaking():
+            for chunk_seq, chunk, energy in self._chunks_from(seq):
+                seq = chunk_seq + 1
+                loud_run = loud_run + 1 if energy > self.energy_threshold * BARGE_IN_ENERGY_RATIO else 0
+                if loud_run >= needed:
+                    return True
+        return False
+
+    def listen(self, timeout=LISTEN_TIMEOUT, phrase_time_limit=PHRASE_TIME_LIMIT, pause_threshold=PAUSE_THRESHOLD,
+               on_chunk=None, after=None):
+        """
+        Returns the next phrase as sr.AudioData, or None if nobody spoke within timeout.
+        on_chunk, if given, is called with each chunk of the phrase as it arrives.
+        With after (from wait_for_wake_word), the phrase starts no earlier than that point.
+        """
+        with self._condition:
+            start_seq = self._next_seq if after is None else after
+        pre_roll = int(PRE_ROLL_SECONDS / self.seconds_per_chunk)
+        pause_chunks = math.ceil(pause_threshold / self.seconds_per_chunk)
+        waited = 0.0
+        frames = []
+        speaking = False
+        quiet_run = 0
+        seq = start_seq
+        while True:
+            for chunk_seq, chunk, energy in self._chunks_from(seq):
+                seq = chunk_seq + 1
+                if not speaking:
+                    if energy > self.energy_threshold:
+                        speaking = True
+                        # Pre-roll: take the chunks just before the onset from the ring buffer.
+                        with self._condition:
+                            first = chunk_seq - pre_roll if after is None else max(after, chunk_seq - pre_roll)
+                            frames = [c[1] for c in self._chunks if first <= c[0] < chunk_seq]
+                        if on_chunk:
+                            for frame in frames:
+                                on_chunk(frame)
+                    else:
+                        waited += self.seconds_per_chunk
+                        if timeout and waited > timeout:
+                            raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+                        continue
+                frames.append(chunk)
+                if on_chunk:
+                    on_chunk(chunk)
+                quiet_run = quiet_run + 1 if energy <= self.energy_threshold else 0
+                phrase_seconds = len(frames) * self.seconds_per_chunk
+                if quiet_run >= pause_chunks or (phrase_time_limit and phrase_seconds > phrase_time_limit):
+                    # Trim the trailing silence, as Recognizer.listen does.
+                    kept = frames[:len(frames) - max(0, quiet_run - pause_chunks // 2)] if quiet_run else frames
+                    return sr.AudioData(b"".join(kept), self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+            if not self._running:
+                return None
+
+
+class SpeechBackend:
+    """
+    Where phrases come from and how they become text. The default capture() reads from
+    the shared microphone stream; transcribe() is what each backend provides.
+    """
+
+    name = "base"
+    # Set once a backend has nothing left to capture (a replay that reached its end).
+    exhausted = False
+
+    def partial_transcriber(self):
+        """A fresh incremental decoder for one phrase, or None if this backend can't stream."""
+        return None
+
+    def wait_for_barge_in(self, still_speaking):
+        """Blocks while still_speaking(); True if the user cut in, False once the speech ended."""
+        stream = MICROPHONE.get()
+        if stream is not None:
+            return stream.wait_for_barge_in(still_speaking)
+        while still_speaking():
+            time.sleep(0.05)
+        return False
+
+    def capture(self, on_partial=None):
+        """
+        Records one phrase. With on_partial, a backend that can stream calls it with
+        each new partial transcript while the user is still speaking, and returns the
+        phrase already transcribed.
+        """
+        stream = MICROPHONE.get()
+        if stream is None:
+            self.exhausted = True
+            return None
+        after = None
+        if WAKE_WORD:
+            detector = WAKE_DETECTOR.get()
+            if detector is not None:
+                after = stream.wait_for_wake_word(detector)
+                if after is None:
+                    return None
+                logger.debug("Wake word heard.")
+        transcriber = self.partial_transcriber() if on_partial else None
+        on_chunk = None
+        if transcriber is not None:
+            def on_chunk(chunk):
+                partial = transcriber.feed(chunk)
+                if partial:
+                    on_partial(partial)
+        logger.info("Listening for your command...")
         try:
-            recognizer.pause_threshold = 1
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
+            audio = stream.listen(on_chunk=on_chunk, after=after)
+            if transcriber is not None and audio is not None:
+                return TranscribedAudio(audio, transcriber.finish())
+            return audio
         except sr.WaitTimeoutError:
-            print("STT: No speech detected within timeout.")
+            logger.debug("No speech detected within timeout.")
+            if after is not None:
+                wake_word.STATS.count('false_triggers')
             return None
         except Exception as e:
-            print(f"STT Error during listening: {e}")
+            logger.warning("Error during listening: %s", e)
+            return None
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+
+class GoogleBackend(SpeechBackend):
+    """Google's web speech API: accurate, but a network round trip per utterance."""
+
+    name = "google"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        try:
+            return self.recognizer.recognize_google(audio)
+        except sr.UnknownValueError:
+            logger.info("Sorry, I did not understand that.")
+            return None
+        except sr.RequestError as e:
+            logger.warning("Could not request results from Google Speech Recognition service; %s", e)
+            return None
+
+
+class VoskBackend(SpeechBackend):
+    """Offline recognition on the CPU with a local Vosk model (pip install vosk)."""
+
+    name = "vosk"
+
+    def __init__(self, model, sample_rate=16000):
+        from vosk import KaldiRecognizer
+
+        self._recognizer_class = KaldiRecognizer
+        self.model = model
+        self.sample_rate = sample_rate
+
+    def transcribe(self, audio):
+        recognizer = self._recognizer_class(self.model, self.sample_rate)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        return json.loads(recognizer.FinalResult()).get("text") or None
+
+    def partial_transcriber(self):
+        stream = MICROPHONE.get()
+        if stream is None or stream.source.SAMPLE_WIDTH != 2:
             return None
+        return _VoskPhrase(self._recognizer_class(self.model, stream.source.SAMPLE_RATE))
 
+
+class _VoskPhrase:
+    """Decodes one phrase chunk by chunk, keeping the text of segments Vosk has finalized."""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.segments = []
+        self.last_partial = ""
+
+    def _text(self, partial=""):
+        return " ".join(segment for segment in self.segments + [partial] if segment)
+
+    def feed(self, chunk):
+        """Returns the transcript so far if it changed, else None."""
+        if self.recognizer.AcceptWaveform(chunk):
+            self.segments.append(json.loads(self.recognizer.Result()).get("text", ""))
+            partial = self._text()
+        else:
+            partial = self._text(json.loads(self.recognizer.PartialResult()).get("partial", ""))
+        if partial == self.last_partial:
+            return None
+        self.last_partial = partial
+        return partial
+
+    def finish(self):
+        self.segments.append(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        return self._text() or None
+
+
+class ReplayBackend(SpeechBackend):
+    """
+    Plays back recorded commands instead of listening, for reproducible runs and benchmarks.
+    path is either a text file with one transcript per line, or a directory of .wav
+    files replayed in name order. A WAV is transcribed by the given backend (e.g. Vosk)
+    or, without one, read from the .txt file of the same name next to it.
+    """
+
+    name = "replay"
+
+    def __init__(self, path, backend=None):
+        self.backend = backend
+        if os.path.isdir(path):
+            self._items = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.lower().endswith(".wav")]
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._items = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        self._position = 0
+
+    def wait_for_barge_in(self, still_speaking):
+        # A replay never talks over JARVIS; it just waits its turn.
+        while still_speaking():
+            time.sleep(0.05)
+        return False
+
+    def capture(self, on_partial=None):
+        if self._position >= len(self._items):
+            self.exhausted = True
+            return None
+        item = self._items[self._position]
+        self._position += 1
+        if not item.lower().endswith(".wav"):
+            if WAKE_WORD:
+                item = wake_word.strip_wake_word(item, WAKE_WORD)
+                if item is None:
+                    return None
+            if on_partial:
+                # Replays a transcript as a speaker would produce it, one word at a time.
+                words = item.split()
+                for i in range(1, len(words)):
+                    on_partial(" ".join(words[:i]))
+            return item
+        with sr.AudioFile(item) as source:
+            return ReplayedAudio(sr.Recognizer().record(source), item)
+
+    def transcribe(self, audio):
+        if isinstance(audio, str):
+            return audio
+        if self.backend is not None:
+            return self.backend.transcribe(audio.audio)
+        transcript = os.path.splitext(audio.path)[0] + ".txt"
+        if os.path.exists(transcript):
+            with open(transcript, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        return None
+
+
+class TranscribedAudio:
+    """A phrase whose transcript was already decoded while it was being captured."""
+
+    def __init__(self, audio, text):
+        self.audio = audio
+        self.text = text
+
+
+class ReplayedAudio:
+    """Audio read back from a WAV file, remembering which file it came from."""
+
+    def __init__(self, audio, path):
+        self.audio = audio
+        self.path = path
+
+
+def _load_vosk_model():
+    model_path = SETTINGS.get('vosk_model_path')
+    if not model_path:
+        logger.warning("vosk_model_path is not set; offline recognition is not available.")
+        return None
     try:
-        print("Recognizing...")
-        command = recognizer.recognize_google(audio)
-        print(f"You said: {command}")
-        return command.lower()
-    except sr.UnknownValueError:
-        print("STT: Sorry, I did not understand that.")
+        from vosk import Model, SetLogLevel
+
+        SetLogLevel(-1)
+        return Model(model_path)
+    except Exception as e:
+        logger.warning("Could not load the Vosk model at %s: %s", model_path, e)
+        return None
+
+def _create_wake_detector():
+    model = VOSK_MODEL.get()
+    stream = MICROPHONE.get()
+    if model is None or stream is None:
+        logger.warning("Wake word %r needs a Vosk model and a microphone; listening without it.", WAKE_WORD)
         return None
-    except sr.RequestError as e:
-        print(f"STT: Could not request results from Google Speech Recognition service; {e}")
+    return wake_word.WakeWordDetector(model, stream.source.SAMPLE_RATE, WAKE_WORD)
+
+def _create_backend():
+    name = SETTINGS.get('stt_backend', 'google')
+    model_path = SETTINGS.get('vosk_model_path')
+
+    def vosk_or_none():
+        model = VOSK_MODEL.get()
+        return VoskBackend(model) if model is not None else None
+
+    if name == 'replay':
+        # WAVs are transcribed offline if a Vosk model is configured, otherwise from their .txt files.
+        return ReplayBackend(SETTINGS.get('stt_replay_path', ''), backend=vosk_or_none() if model_path else None)
+    if name == 'vosk':
+        backend = vosk_or_none()
+        if backend is not None:
+            return backend
+        logger.warning("Falling back to Google speech recognition.")
+    return GoogleBackend()
+
+def _open_microphone_stream():
+    try:
+        return MicrophoneStream().start()
+    except Exception as e:
+        logger.warning("Error opening the microphone: %s", e)
         return None
+
+# Shared by the Vosk backend and the wake word detector.
+VOSK_MODEL = LazyResource("vosk_model", _load_vosk_model)
+WAKE_DETECTOR = LazyResource("wake_word", _create_wake_detector)
+# Chosen by "stt_backend" in settings.json.
+BACKEND = LazyResource("stt", _create_backend)
+# Opening the microphone and calibrating takes over a second, so it happens on the
+# first listen_for_command() (or an explicit init_stt()) instead of at import time.
+# After that the device stays open; every listen reads from the same stream.
+# Replay never touches it.
+MICROPHONE = LazyResource("microphone", _open_microphone_stream)
+
+def init_stt():
+    backend = BACKEND.get()
+    if not isinstance(backend, ReplayBackend):
+        MICROPHONE.get()
+    return backend
+
+@metrics.timed(metrics.STAGE_SECONDS, stage='stt_capture')
+def capture_audio(on_partial=None):
+    """Captures one phrase from the configured backend; None if nothing was said."""
+    return init_stt().capture(on_partial=on_partial)
+
+@metrics.timed(metrics.STAGE_SECONDS, stage='stt_recognize')
+def recognize(audio):
+    """Turns captured audio into lowercased text, or None if it couldn't be understood."""
+    backend = init_stt()
+    try:
+        logger.debug("Recognizing...")
+        start = time.perf_counter()
+        wake_word.STATS.count('recognitions')
+        command = audio.text if isinstance(audio, TranscribedAudio) else backend.transcribe(audio)
+        logger.debug("%s recognition took %.0f ms", backend.name, (time.perf_counter() - start) * 1000)
+        if not command:
+            if WAKE_WORD:
+                # Woken up, but nothing intelligible followed.
+                wake_word.STATS.count('false_triggers')
+            return None
+        logger.info("You said: %s", command)
+        return command.lower()
     except Exception as e:
-        print(f"STT Error during recognition: {e}")
+        logger.warning("Recognition failed: %s", e)
         return None
 
-init_stt()
+def listen_for_command():
+    audio = capture_audio()
+    if audio is None:
+        return None
+    return recognize(audio)
 
 if __name__ == '__main__':
     speak_direct = True  # Set to False if you don't have TTS from this file
@@ -1,31 +1,253 @@
-import pyttsx3
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
 
-engine  = None
+from jarvis_core.tts_cache import AudioCache, play_wav, remove_file
+from jarvis_core.utils import config_loader, metrics
+from jarvis_core.utils.startup import LazyResource
+
+SETTINGS = config_loader.load_settings()
+
+
+def _create_engine():
+    import pyttsx3
 
-def init_tts():
-    global engine
     try:
         engine = pyttsx3.init()
         voices = engine.getProperty('voices')
         engine.setProperty('voice' , voices[3].id)
         # engine.setProperty('rate', 210)
+        return engine
     except Exception as e:
         print(f"Error Initializing TTS engine: {e}")
-        engine = None
+        return None
 
-def speak(text):
-    global engine
-    if not engine:
-        print("TTS engine not initialized. Call init_tts() first")
-        return
+# Built by the speech worker the first time something is said, on the worker's own
+# thread: pyttsx3 drivers expect to be used from the thread that created them.
+ENGINE = LazyResource("tts", _create_engine)
+
+def _create_audio_cache():
+    if not SETTINGS.get('tts_cache_enabled', True):
+        return None
+    return AudioCache(config_loader.cache_dir('tts'), SETTINGS.get('tts_cache_max_mb', 50) * 1024 * 1024)
+
+def _create_audio_output():
     try:
-        engine.say(text)
-        engine.runAndWait()
-    except Exception as e:
-        print(f"Error during speech: {e}")
+        import pyaudio
+
+        return pyaudio.PyAudio()
+    except (ImportError, OSError) as e:
+        print(f"Warning: PyAudio is not available ({e}); cached speech will not be used.")
+        return None
+
+# Sentences that have been spoken before are played from rendered audio instead of
+# being synthesized again; playback needs PyAudio, which the microphone uses anyway.
+AUDIO_CACHE = LazyResource("tts_cache", _create_audio_cache)
+AUDIO_OUTPUT = LazyResource("audio_output", _create_audio_output)
+# A sentence is rendered into the cache once it has been spoken this many times live,
+# so one-off answers (the time, a weather report) don't fill it up.
+RENDER_AFTER_SIGHTINGS = 2
+
+# Time spent saying each sentence, whether played from the cache or synthesized.
+SENTENCE_SECONDS = metrics.histogram(metrics.STAGE_SECONDS, stage='tts_sentence')
+
+_SENTENCE_BREAK = re.compile(r"\n+|(?<=[.!?])\s+")
+
+
+def split_sentences(text):
+    """Splits a response into sentences (and lines, for multi-line reports like the weather)."""
+    return [sentence.strip() for sentence in _SENTENCE_BREAK.split(text) if sentence.strip()]
+
+
+class SpeechWorker:
+    """
+    Speaks on a dedicated thread so the caller never waits for a whole reply.
+    Responses are queued sentence by sentence; the first one starts playing as soon
+    as it is queued, and interrupt() (barge-in) stops the current sentence at the
+    next word and drops the rest. When idle, the worker renders repeated and
+    prerender()ed sentences into the audio cache.
+    """
+
+    def __init__(self):
+        self.stats = None  # Anything with record(seconds); gets each sentence's playing time
+        self.sentences_started = 0
+        self.cache_hits = 0
+        self._queue = queue.Queue()
+        self._to_render = queue.Queue()
+        self._sightings = OrderedDict()
+        self._rendering = False
+        self._cache = None
+        self._output = None
+        self._voice_key = None
+        self._idle = threading.Event()
+        self._idle.set()
+        self._generation = 0
+        self._stop_current = False
+        self._engine = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.ready = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tts", daemon=True)
+                self._thread.start()
+
+    def say(self, text):
+        """Queues text to be spoken and returns immediately."""
+        sentences = split_sentences(text)
+        if not sentences:
+            return
+        self.start()
+        with self._lock:
+            self._idle.clear()
+            for sentence in sentences:
+                self._queue.put((self._generation, sentence))
+
+    def prerender(self, texts):
+        """Queues texts to be rendered into the audio cache whenever the worker is idle."""
+        self.start()
+        for text in texts:
+            for sentence in split_sentences(text):
+                self._to_render.put(sentence)
+
+    def interrupt(self):
+        """Stops the sentence being spoken and discards everything still queued."""
+        with self._lock:
+            self._generation += 1
+            self._stop_current = True
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def is_speaking(self):
+        return not self._idle.is_set()
+
+    def wait(self, timeout=None):
+        """Blocks until everything queued has been spoken; False if timeout ran out first."""
+        return self._idle.wait(timeout)
+
+    def _on_word(self, name, location, length):
+        # pyttsx3 can only be stopped from inside its own loop, so barge-in is checked per word.
+        if self._stop_current and not self._rendering:
+            self._engine.stop()
+
+    def _run(self):
+        self._engine = ENGINE.get()
+        if self._engine:
+            self._engine.connect('started-word', self._on_word)
+            self._cache = AUDIO_CACHE.get()
+            if self._cache is not None:
+                self._output = AUDIO_OUTPUT.get()
+                self._voice_key = (self._engine.getProperty('voice'), self._engine.getProperty('rate'))
+        self.ready.set()
+        while True:
+            try:
+                generation, sentence = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                self._render_next()
+                continue
+            with self._lock:
+                current = generation == self._generation
+                self._stop_current = False
+            if current:
+                self.sentences_started += 1
+                start = time.perf_counter()
+                self._speak(sentence)
+                elapsed = time.perf_counter() - start
+                SENTENCE_SECONDS.observe(elapsed)
+                if self.stats is not None:
+                    self.stats.record(elapsed)
+            with self._lock:
+                if self._queue.empty():
+                    self._idle.set()
+
+    def _speak(self, sentence):
+        if not self._engine:
+            print(f"TTS engine not available, could not speak the response: {sentence}")
+            return
+        if self._output is not None:
+            path = self._cache.get(sentence, *self._voice_key)
+            if path is not None:
+                try:
+                    play_wav(path, self._output, lambda: self._stop_current)
+                    self.cache_hits += 1
+                    return
+                except Exception as e:
+                    print(f"Error playing cached speech, synthesizing instead: {e}")
+            self._seen(sentence)
+        try:
+            self._engine.say(sentence)
+            self._engine.runAndWait()
+        except Exception as e:
+            print(f"Error during speech: {e}")
+
+    def _seen(self, sentence):
+        count = self._sightings.pop(sentence, 0) + 1
+        self._sightings[sentence] = count
+        if len(self._sightings) > 512:
+            self._sightings.popitem(last=False)
+        if count == RENDER_AFTER_SIGHTINGS:
+            self._to_render.put(sentence)
+
+    def _render_next(self):
+        if self._output is None:
+            return
+        try:
+            sentence = self._to_render.get_nowait()
+        except queue.Empty:
+            return
+        path = self._cache.path_for(sentence, *self._voice_key)
+        if os.path.exists(path):
+            return
+        partial = self._cache.partial_path_for(path)
+        self._rendering = True
+        try:
+            self._engine.save_to_file(sentence, partial)
+            self._engine.runAndWait()
+            os.replace(partial, path)
+            self._cache.add(path)
+        except Exception as e:
+            print(f"Error rendering speech for the cache: {e}")
+            remove_file(partial)
+        finally:
+            self._rendering = False
+
+
+WORKER = SpeechWorker()
+
+def init_tts():
+    """Starts the speech worker and waits for its engine."""
+    WORKER.start()
+    WORKER.ready.wait()
+    return WORKER._engine
+
+def say(text):
+    """Non-blocking: queues text on the speech worker."""
+    WORKER.say(text)
+
+@metrics.timed(metrics.STAGE_SECONDS, stage='tts_speak')
+def speak(text):
+    """Speaks text and waits until it (and anything queued before it) has been said."""
+    WORKER.say(text)
+    WORKER.wait()
+
+def prerender(texts):
+    """Renders fixed phrases (banner, greetings, prompts) into the audio cache in the background."""
+    WORKER.prerender(texts)
+
+def interrupt():
+    WORKER.interrupt()
 
-init_tts()
+def is_speaking():
+    return WORKER.is_speaking()
 
 if __name__ == "__main__":
     speak("Hello, this is a test of the text to speech system")
-    speak("JARVIS version 2.0 online. How can I help you ?")
\ No newline at end of file
+    speak("JARVIS version 2.0 online. How can I help you ?")
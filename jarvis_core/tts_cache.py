@@ -0,0 +1,96 @@
+import hashlib
+import os
+import threading
+import wave
+
+# A sentence is rendered to this name first and renamed into place once it is complete.
+PARTIAL_SUFFIX = ".part.wav"
+
+
+def remove_file(path):
+    """Deletes path, ignoring a file that is already gone or can't be removed."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class AudioCache:
+    """
+    Rendered speech on disk, one WAV per sentence, named by the SHA-256 of the text,
+    voice id and rate, so any change to the voice simply misses. Once the directory
+    grows past max_bytes, the least recently played files are deleted.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, text, voice, rate):
+        key = hashlib.sha256(f"{voice}\0{rate}\0{text}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + ".wav")
+
+    @staticmethod
+    def partial_path_for(path):
+        """Where the rendering of path is written until it is complete."""
+        return path[:-len(".wav")] + PARTIAL_SUFFIX
+
+    def get(self, text, voice, rate):
+        """The cached file for this sentence, or None. A hit counts as a use for eviction."""
+        path = self.path_for(text, voice, rate)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def add(self, path):
+        """Checks a freshly rendered file is a playable WAV, then trims the cache to size."""
+        try:
+            with wave.open(path, 'rb') as wf:
+                if wf.getnframes() == 0:
+                    raise wave.Error("empty rendering")
+        except (wave.Error, EOFError, OSError) as e:
+            # Some drivers (e.g. macOS) don't write WAV; those sentences are simply not cached.
+            print(f"TTS cache: could not use rendered audio {os.path.basename(path)}: {e}")
+            remove_file(path)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                # Still being written by a render; it isn't part of the cache yet.
+                if name.endswith(PARTIAL_SUFFIX):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                remove_file(path)
+                total -= size
+
+
+def play_wav(path, pyaudio_instance, should_stop, chunk_frames=1024):
+    """Plays a WAV file chunk by chunk, stopping early once should_stop() is true."""
+    with wave.open(path, 'rb') as wf:
+        stream = pyaudio_instance.open(format=pyaudio_instance.get_format_from_width(wf.getsampwidth()),
+                                       channels=wf.getnchannels(), rate=wf.getframerate(), output=True)
+        try:
+            data = wf.readframes(chunk_frames)
+            while data and not should_stop():
+                stream.write(data)
+                data = wf.readframes(chunk_frames)
+        finally:
+            stream.stop_stream()
+            stream.close()
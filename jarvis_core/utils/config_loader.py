@@ -1,5 +1,6 @@
 import json
 import os
+import sys
 
 CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config')
 API_KEYS_FILE = os.path.join(CONFIG_DIR, 'api_keys.json')
@@ -10,7 +11,7 @@ def load_api_keys():
         with open(API_KEYS_FILE, 'r') as f:
             return json.load(f)
     except FileNotFoundError:
-        print(f"Warning: API keys file not found at {API_KEYS_FILE}. Some features may not work.")
+        print(f"Warning: API keys file not found at {API_KEYS_FILE}. Some features may not work.", file=sys.stderr)
         return {}
     except json.JSONDecodeError:
         print(f"Error: Could not decode JSON from {API_KEYS_FILE}.")
@@ -26,6 +27,11 @@ def load_settings():
         print(f"Error: Could not decode JSON from {SETTINGS_FILE}.")
         return {}
 
+def cache_dir(*parts):
+    """Where on-disk caches live: settings' cache_dir (relative paths are taken from the project root)."""
+    root = os.path.join(os.path.dirname(CONFIG_DIR), load_settings().get('cache_dir', 'cache'))
+    return os.path.join(root, *parts)
+
 if __name__ == '__main__':
     keys = load_api_keys()
     print("Loaded API Keys:", keys)
@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """
+    A persistent string key/value store backed by one SQLite file.
+    Every value is stored with the time it was written, so callers can decide
+    for themselves when an entry is stale. The database is opened on first use.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, key):
+        """Returns (value, stored_at) for key, or None if it was never stored."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def put(self, key, value):
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,242 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from jarvis_core.utils import config_loader
+
+SETTINGS = config_loader.load_settings()
+
+# Upper bounds, in seconds, of the histogram buckets: from sub-millisecond NLP steps
+# up to network actions and spoken replies.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The histogram families JARVIS records into.
+STAGE_SECONDS = "jarvis_stage_seconds"    # label stage: stt_capture, stt_recognize, intent, entities, ...
+ACTION_SECONDS = "jarvis_action_seconds"  # label intent: one series per action handler
+
+
+class Histogram:
+    """A cumulative-bucket latency histogram, safe to observe from any thread."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    # Same interface as StageStats, so a histogram can be handed to anything that records timings.
+    record = observe
+
+    def quantile(self, fraction):
+        """Estimates a quantile by linear interpolation within its bucket."""
+        with self._lock:
+            counts, total, largest = list(self.counts), self.count, self.max
+        if not total:
+            return 0.0
+        rank = fraction * total
+        seen = 0
+        for index, in_bucket in enumerate(counts):
+            if in_bucket and seen + in_bucket >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else largest
+                return min(largest, lower + (upper - lower) * (rank - seen) / in_bucket)
+            seen += in_bucket
+        return largest
+
+    def snapshot(self):
+        with self._lock:
+            count, total, largest, counts = self.count, self.sum, self.max, list(self.counts)
+        cumulative, buckets = 0, []
+        for bound, in_bucket in zip(self.buckets + (float('inf'),), counts):
+            cumulative += in_bucket
+            buckets.append((bound, cumulative))
+        return {
+            'count': count,
+            'sum_seconds': total,
+            'mean_ms': total / count * 1000 if count else 0.0,
+            'p50_ms': self.quantile(0.50) * 1000,
+            'p95_ms': self.quantile(0.95) * 1000,
+            'max_ms': largest * 1000,
+            'buckets': buckets,
+        }
+
+
+class Registry:
+    """Histograms by (family name, labels), created on first use."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Times the enclosed block into the named histogram."""
+        histogram = self.histogram(name, **labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def timed(self, name, **labels):
+        """Decorator version of timer()."""
+        def decorator(fn):
+            histogram = self.histogram(name, **labels)
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    def snapshot(self):
+        """Every histogram as JSON-ready dicts, grouped by family."""
+        families = {}
+        for (name, labels), histogram in self._items():
+            series = histogram.snapshot()
+            series['buckets'] = [['+Inf' if bound == float('inf') else bound, n] for bound, n in series['buckets']]
+            families.setdefault(name, []).append({'labels': dict(labels), **series})
+        return families
+
+    def prometheus_text(self):
+        """The Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        current = None
+        for (name, labels), histogram in self._items():
+            if name != current:
+                lines.append(f"# TYPE {name} histogram")
+                current = name
+            series = histogram.snapshot()
+            for bound, cumulative in series['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {series['sum_seconds']!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path):
+        """Writes snapshot() to path atomically, so a reader never sees half a file."""
+        partial = path + ".tmp"
+        with open(partial, 'w') as f:
+            json.dump({'time': time.time(), 'metrics': self.snapshot()}, f, indent=2)
+        os.replace(partial, path)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+REGISTRY = Registry()
+
+def histogram(name, **labels):
+    return REGISTRY.histogram(name, **labels)
+
+def observe(name, seconds, **labels):
+    REGISTRY.observe(name, seconds, **labels)
+
+def timer(name, **labels):
+    return REGISTRY.timer(name, **labels)
+
+def timed(name, **labels):
+    return REGISTRY.timed(name, **labels)
+
+
+def _handler(registry):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.prometheus_text(), 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(registry.snapshot()), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would otherwise flood the console
+    return Handler
+
+
+def serve(port, host='127.0.0.1', registry=REGISTRY):
+    """Serves /metrics (Prometheus text) and /metrics.json on a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), _handler(registry))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def dump_periodically(path, interval_seconds, registry=REGISTRY):
+    """Rewrites path with the registry's JSON snapshot every interval_seconds, on a daemon thread."""
+    def run():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                registry.dump_json(path)
+            except OSError as e:
+                print(f"Warning: could not write metrics to '{path}': {e}")
+    thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_exporters():
+    """Starts whichever exporters are configured in settings.json (both are off by default)."""
+    port = SETTINGS.get('metrics_port', 0)
+    if port:
+        try:
+            serve(port, SETTINGS.get('metrics_host', '127.0.0.1'))
+            print(f"Metrics: serving http://{SETTINGS.get('metrics_host', '127.0.0.1')}:{port}/metrics")
+        except OSError as e:
+            print(f"Warning: could not start the metrics endpoint on port {port}: {e}")
+    path = SETTINGS.get('metrics_json_path', '')
+    if path:
+        dump_periodically(path, SETTINGS.get('metrics_dump_interval_seconds', 60))
@@ -0,0 +1,87 @@
+import threading
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+
+_TIMINGS = []
+_TIMINGS_LOCK = threading.Lock()
+
+
+def record(component, phase, seconds):
+    with _TIMINGS_LOCK:
+        _TIMINGS.append((component, phase, seconds, threading.current_thread().name))
+
+
+@contextmanager
+def timed(component, phase):
+    """Times the enclosed block and files it under component/phase in the startup report."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(component, phase, time.perf_counter() - start)
+
+
+def mark(label):
+    """Records how long after process start a milestone (e.g. the first prompt) was reached."""
+    record(label, "milestone", time.perf_counter() - PROCESS_START)
+
+
+def report():
+    """Formats every recorded timing as a small table, slowest first within each phase."""
+    with _TIMINGS_LOCK:
+        timings = list(_TIMINGS)
+
+    lines = ["--- Startup profile ---", f"{'component':<24}{'phase':<11}{'ms':>10}  thread"]
+    for phase in ("import", "init", "milestone"):
+        rows = sorted((t for t in timings if t[1] == phase), key=lambda t: t[2], reverse=True)
+        for component, _, seconds, thread_name in rows:
+            lines.append(f"{component:<24}{phase:<11}{seconds * 1000:>10.1f}  {thread_name}")
+    return "\n".join(lines)
+
+
+class LazyResource:
+    """
+    A heavy resource (model, device, client) that is only built when first needed.
+    get() is thread-safe, so a resource can be warmed in the background while the
+    main thread carries on, and a caller that gets there first simply waits for it.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self._factory = factory
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    with timed(self.name, "init"):
+                        self._value = self._factory()
+                    self._loaded = True
+        return self._value
+
+    def replace(self, value):
+        """Swaps in a new value (a retrained model, say). Callers already holding the old one keep using it."""
+        with self._lock:
+            old, self._value = self._value, value
+            self._loaded = True
+        return old
+
+    def warm(self):
+        """Builds the resource on a daemon thread and returns that thread."""
+        thread = threading.Thread(target=self.get, name=f"warm-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+
+def warm_in_background(resources):
+    """Starts warming every resource at once; join the returned threads to wait for them."""
+    return [resource.warm() for resource in resources]
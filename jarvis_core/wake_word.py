@@ -0,0 +1,91 @@
+import json
+import threading
+
+
+class WakeWordStats:
+    """Counters for how much audio reaches which stage, to track idle CPU and recognition volume."""
+
+    FIELDS = ('frames', 'voiced_frames', 'wake_triggers', 'false_triggers', 'ignored_phrases', 'recognitions')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for field in self.FIELDS:
+                setattr(self, field, 0)
+
+    def count(self, field, n=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def snapshot(self):
+        with self._lock:
+            return {field: getattr(self, field) for field in self.FIELDS}
+
+    def report(self):
+        return "--- Wake word ---\n" + "\n".join(f"{field:<16}{value:>8}" for field, value in self.snapshot().items())
+
+
+STATS = WakeWordStats()
+
+
+class WakeWordDetector:
+    """
+    Spots the wake word in short microphone frames. Frames at or below the energy
+    threshold are skipped without decoding (a cheap VAD), and voiced ones go to a Vosk
+    recognizer restricted to a one-word grammar, far cheaper than full recognition.
+    """
+
+    # Silent frames after which a half-heard word is forgotten.
+    RESET_AFTER_SILENT_FRAMES = 8
+
+    def __init__(self, model, sample_rate, wake_word="jarvis", stats=None):
+        from vosk import KaldiRecognizer
+
+        self.wake_word = wake_word.lower()
+        self.stats = stats or STATS
+        self.recognizer = KaldiRecognizer(model, sample_rate, json.dumps([self.wake_word, "[unk]"]))
+        self._silent_frames = 0
+
+    def feed(self, chunk, voiced):
+        """Returns True if this frame completes the wake word."""
+        self.stats.count('frames')
+        if not voiced:
+            self._silent_frames += 1
+            if self._silent_frames == self.RESET_AFTER_SILENT_FRAMES:
+                self.recognizer.Reset()
+            return False
+        self._silent_frames = 0
+        self.stats.count('voiced_frames')
+
+        if self.recognizer.AcceptWaveform(chunk):
+            heard = json.loads(self.recognizer.Result()).get("text", "")
+        else:
+            heard = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        if self.wake_word in heard.split():
+            self.recognizer.Reset()
+            self.stats.count('wake_triggers')
+            return True
+        return False
+
+
+def strip_wake_word(text, wake_word, stats=None):
+    """
+    The text-only version of the gate, for transcripts that never were audio:
+    returns what follows the wake word ("hey jarvis, what time is it" -> "what time is it"),
+    or None if the phrase doesn't contain it.
+    """
+    stats = stats or STATS
+    words = text.split()
+    for i, word in enumerate(words[:3]):
+        if word.strip(",.!?").lower() == wake_word.lower():
+            stats.count('wake_triggers')
+            rest = " ".join(words[i + 1:]).lstrip(",.!? ")
+            if not rest:
+                stats.count('false_triggers')
+                return None
+            return rest
+    stats.count('ignored_phrases')
+    return None
@@ -1,14 +1,63 @@
+import argparse
+import contextlib
+import logging
+import queue
+import sys
+import threading
+import time
 from http.client import responses
 
-from jarvis_core import tts
-from jarvis_core import stt
-from jarvis_core.actions import system_ops
-from jarvis_core.actions import web_ops
-from jarvis_core.actions import math_ops
-from jarvis_core.actions import app_ops
-from jarvis_core.actions import system_control_ops
-from jarvis_core.nlp import processor
-from jarvis_core.nlp.processor import nlp as spacy_nlp_model
+from jarvis_core.utils import config_loader, metrics, startup
+
+# Every module below defers its heavy resources, so importing them is cheap;
+# the timings are still recorded for --profile-startup.
+with startup.timed("tts", "import"):
+    from jarvis_core import tts
+with startup.timed("stt", "import"):
+    from jarvis_core import stt
+with startup.timed("system_ops", "import"):
+    from jarvis_core.actions import system_ops
+with startup.timed("web_ops", "import"):
+    from jarvis_core.actions import web_ops
+with startup.timed("math_ops", "import"):
+    from jarvis_core.actions import math_ops
+with startup.timed("app_ops", "import"):
+    from jarvis_core.actions import app_ops
+with startup.timed("system_control_ops", "import"):
+    from jarvis_core.actions import system_control_ops
+with startup.timed("processor", "import"):
+    from jarvis_core.nlp import processor
+from jarvis_core import wake_word
+from jarvis_core.executor import ERROR_RESPONSE, ActionExecutor
+from jarvis_core.headless import run_headless
+from jarvis_core.pipeline import Pipeline, Stage
+
+logger = logging.getLogger("jarvis")
+
+# Resources that are safe to build off the main thread while the greeting plays.
+# The TTS engine is built on its own speech worker thread, the volume COM endpoint
+# stays on the main thread, and the microphone is calibrated on the first listen so
+# it does not hear the greeting.
+BACKGROUND_WARMUP = [
+    processor.NLP,
+    processor.INTENT_CLASSIFIER,
+    app_ops.APP_PATHS,
+    web_ops.WIKI,
+]
+
+# Handlers that must stay on the main thread: the volume ones talk to a COM endpoint created there.
+MAIN_THREAD_INTENTS = {"increase_volume", "decrease_volume", "toggle_mute", "set_volume"}
+# Network-bound handlers get longer than the executor's default timeout.
+ACTION_TIMEOUTS = {"get_weather": 30, "search_wikipedia": 30, "open_target": 15, "close_target": 15}
+# Capacity of each queue between pipeline stages. Small on purpose: a backlog of stale
+# commands is worse than making capture wait for recognition to catch up.
+PIPELINE_QUEUE_SIZE = 4
+
+# Started from partial transcripts, so the answer is nearly ready when the user stops talking.
+processor.PREWARM_HANDLERS.update({
+    "get_weather": lambda entities, cancelled: web_ops.warm_weather_connection(),
+    "search_wikipedia": lambda entities, cancelled: web_ops.prefetch_wikipedia_summary(entities.get('query'), cancelled),
+})
 
 current_conversation_context = {}
 
@@ -61,6 +110,29 @@ def handle_calculation(entities):
 
     return math_ops.evaluate_expression(expression)
 
+# How each intent is described when JARVIS has to ask which one was meant.
+INTENT_DESCRIPTIONS = {
+    "greet": "say hello",
+    "get_time": "tell you the time",
+    "get_date": "tell you the date",
+    "exit": "shut down",
+    "open_target": "open something",
+    "close_target": "close something",
+    "increase_volume": "turn the volume up",
+    "decrease_volume": "turn the volume down",
+    "toggle_mute": "mute or unmute",
+    "set_volume": "set the volume",
+    "get_weather": "check the weather",
+    "search_wikipedia": "look something up on Wikipedia",
+    "calculate": "do a calculation",
+}
+
+def handle_clarification(entities):
+    options = [INTENT_DESCRIPTIONS[tag] for tag in entities.get('candidates', []) if tag in INTENT_DESCRIPTIONS]
+    if len(options) < 2:
+        return action_handler["unknown"](entities)
+    return f"I'm not sure whether you wanted me to {options[0]} or {options[1]}. Could you rephrase that?"
+
 action_handler = {
     "greet": lambda entities: "Hello Sir, How can I assist you today ?",
     "get_time": lambda entities: system_ops.get_current_time(),
@@ -75,13 +147,30 @@ action_handler = {
     "get_weather": initiate_get_weather, # Defined in web_ops.py
     "search_wikipedia": web_ops.search_wikipedia_action, # And this one too
     "calculate": handle_calculation,
+    "clarify": handle_clarification,
     "unknown": lambda entities: "Sorry, I don't understand that command yet."
 }
 
+GREETING = "JARVIS version 2.0 online. How can I help you ?"
+NOT_UNDERSTOOD = "I didn't catch that, please try again!"
+# Fixed replies worth having as ready-made audio; rendered in the background at startup.
+PRERENDER_PHRASES = [
+    GREETING,
+    NOT_UNDERSTOOD,
+    action_handler["greet"]({}),
+    action_handler["exit"]({}),
+    action_handler["unknown"]({}),
+    "For which location would you like the weather?",
+    "Do you prefer Celsius or Fahrenheit?",
+    "Do you prefer Celsius or Fahrenheit for the weather?",
+    "Toggling mute.",
+]
+
 def handle_pending_conversation(command_text):
     """
     If a conversation is pending(e.g waiting for unit preference for temperature),
     this function tries to process command_text as the answer.
+    Returns (intent, thunk) like resolve_command, or None if nothing was pending.
     """
     global current_conversation_context
     if not current_conversation_context:
@@ -101,32 +190,32 @@ def handle_pending_conversation(command_text):
 
             if unit_preference:
                 location = current_conversation_context.get('location')
-                weather_report = web_ops.get_weather_action(location=location, unit_preference=unit_preference)
-                current_conversation_context = {}  # Clear context, conversation resolved
-                return weather_report
+                # Clear context before the fetch, conversation resolved; the next command
+                # may arrive while the weather is still being fetched.
+                current_conversation_context = {}
+                return 'get_weather', lambda: web_ops.get_weather_action(location=location, unit_preference=unit_preference)
             else:
                 # Didn't understand the unit preference, ask again or give up
-                location = current_conversation_context.get('location')
-                return f"Sorry, I didn't catch that. Please say Celsius or Fahrenheit."
+                return 'get_weather', _reply("Sorry, I didn't catch that. Please say Celsius or Fahrenheit.")
 
         elif awaiting == 'location':  # If JARVIS asked "For which location?"
             # Directly process the input text with spaCy to find entities,
             # as the user likely just gave the location name in response.
-            doc = spacy_nlp_model(command_text)  # Use the imported spaCy model directly
+            doc = processor.NLP.get()(command_text)  # Use the shared spaCy model directly
             location_entity = None
-            print(f"DEBUG: Checking entities in '{command_text}' for pending location...")  # Debug
+            logger.debug("Checking entities in %r for pending location...", command_text)
             for ent in doc.ents:
-                print(f"DEBUG: Found entity: '{ent.text}' ({ent.label_})")  # Debug
+                logger.debug("Found entity: %r (%s)", ent.text, ent.label_)
                 if ent.label_ == "GPE":  # Geopolitical Entity (cities, countries, states)
                     location_entity = ent.text
-                    print(f"DEBUG: Identified GPE entity '{location_entity}'.")
+                    logger.debug("Identified GPE entity %r.", location_entity)
                     break  # Take the first GPE found
 
 
 
             if not location_entity and len(doc) == 1 and doc[0].pos_ == "PROPN":
                 location_entity = doc[0].text
-                print(f"DEBUG: No GPE found, assuming single PROPN '{location_entity}' is location.")
+                logger.debug("No GPE found, assuming single PROPN %r is location.", location_entity)
 
             if location_entity:
                 # Location found! Update context to wait for unit preference.
@@ -139,51 +228,201 @@ def handle_pending_conversation(command_text):
                 response = f"Do you prefer Celsius or Fahrenheit for the weather?"
             else:
 
-                print(f"DEBUG: No location entity (GPE or single PROPN) found in isolated response: '{command_text}'")
+                logger.debug("No location entity (GPE or single PROPN) found in isolated response: %r", command_text)
 
                 response = "I still didn't quite catch the location. Could you please tell me the city name again?"
 
+            return 'get_weather', _reply(response)
 
-    return response
+    return None
 
-def process_command_ml(command_text):
-    global current_conversation_context
-    pending_response = handle_pending_conversation(command_text)
+def _reply(response):
+    return lambda: response
 
-    if pending_response:
-        return pending_response
+def resolve_command(command_text):
+    """
+    Works out what command_text asks for without carrying it out: returns (intent, thunk),
+    where thunk() performs the action and returns the response to speak.
+    Conversation context is only read and updated here, on the calling thread, so the
+    thunks can run on the executor's workers. Running a thunk is timed per intent.
+    """
+    intent, action = _resolve(command_text)
+    return intent, metrics.timed(metrics.ACTION_SECONDS, intent=intent)(action)
+
+def _resolve(command_text):
+    pending = handle_pending_conversation(command_text)
+    if pending:
+        return pending
 
     nlp_result = processor.process_text_ml(command_text)
     intent = nlp_result.get('intent')
     entities = nlp_result.get('entities', {})
 
-    if intent == "exit":
-        response = action_handler[intent](entities)  # Get the goodbye message
-        tts.speak(response)
-        return "exit_signal"
+    if intent == "get_weather":
+        # Only asks a follow-up question, but it moves the conversation along.
+        return intent, _reply(initiate_get_weather(entities))
 
     if intent in action_handler:
         action_function = action_handler[intent]
         # Passing entities; the handler function will use them or manage context
-        return action_function(entities)
+        return intent, lambda: action_function(entities)
 
     else:
-        return "I'm not sure how to handle that request right now."
+        return intent, _reply("I'm not sure how to handle that request right now.")
 
-def run_jarvis():
-    tts.speak("JARVIS version 2.0 online. How can I help you ?")
+def process_command_ml(command_text):
+    """Resolves and runs a command synchronously, returning its response."""
+    intent, action = resolve_command(command_text)
 
+    if intent == "exit":
+        tts.speak(action())  # The goodbye message
+        return "exit_signal"
+
+    return action()
+
+def captured_phrases():
+    """Yields each phrase the STT backend captures (None on a silent timeout)."""
+    backend = stt.init_stt()
+    on_partial = processor.speculate if stt.STREAMING else None
+    while not backend.exhausted:
+        if tts.is_speaking():
+            if not backend.wait_for_barge_in(tts.is_speaking):
+                continue
+            logger.info("Barge-in, stopping speech.")
+            tts.interrupt()
+            tts.WORKER.wait()
+        marker = tts.WORKER.sentences_started
+        audio = stt.capture_audio(on_partial=on_partial)
+        # Drop a phrase that JARVIS started talking over; it would hear itself.
+        yield None if tts.WORKER.sentences_started != marker else audio
+    logger.info("Nothing more to listen to.")
+
+def build_pipeline(executor):
+    """
+    Wires up capture -> recognize -> resolve as worker threads joined by bounded queues.
+    Resolved actions run on the executor, whose responses queue feeds the TTS worker
+    (see speak_responses).
+    """
+    pipeline = Pipeline()
+    audio_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    command_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    action_stats = pipeline.track("action")
+
+    def dispatch(command):
+        intent, action = resolve_command(command)
+        processor.settle_speculation(intent)
+        if intent == "exit" or intent in MAIN_THREAD_INTENTS:
+            # Handed to the main thread as-is; speak_responses runs it there.
+            executor.responses.put((intent, action_stats.timed(action)))
+        else:
+            executor.submit(intent, action_stats.timed(action))
+
+    pipeline.add(Stage("capture", source=captured_phrases(), outbox=audio_queue))
+    pipeline.add(Stage("recognize", handler=stt.recognize, inbox=audio_queue, outbox=command_queue))
+    pipeline.add(Stage("resolve", handler=dispatch, inbox=command_queue))
+    return pipeline
+
+# Socket sessions share one conversation context; resolving one command at a time keeps it consistent.
+_resolve_lock = threading.Lock()
+
+def handle_text_command(command_text):
+    """
+    Resolves and runs one command with no audio involved, for headless mode.
+    Returns the JSON-ready result, including how long it took. A command that fails
+    gets the spoken error response plus an 'error' field, and the session goes on.
+    """
+    start = time.perf_counter()
+    intent, error = None, None
+    try:
+        with _resolve_lock:
+            intent, action = resolve_command(command_text)
+        response = action()
+    except Exception as e:
+        print(f"Error handling '{command_text}': {e}")
+        response, error = ERROR_RESPONSE, str(e)
+    result = {
+        'command': command_text,
+        'intent': intent,
+        'response': response,
+        'latency_ms': round((time.perf_counter() - start) * 1000, 3),
+    }
+    if error is not None:
+        result['error'] = error
+    return result
+
+def run_headless_jarvis(source):
+    # Only stdout carries the JSON lines; progress messages and logging go to stderr.
+    out = sys.stdout
+    metrics.start_exporters()
+    processor.start_model_reloading()
+    startup.warm_in_background([processor.NLP, processor.INTENT_CLASSIFIER])
+    with contextlib.redirect_stdout(sys.stderr):
+        run_headless(source, handle_text_command, out=out)
+
+def speak_responses(executor):
+    """
+    Hands responses to the TTS worker as they arrive, without waiting for them to be
+    spoken, until the exit command comes through. Main-thread actions run here; one
+    that fails gets the same error response as a failed action on the executor.
+    """
     while True:
-        command = stt.listen_for_command()
-
-        if command:
-            response = process_command_ml(command)
-            if response == "exit_signal":
-                break
-            elif response:
-                tts.speak(response)
-            else:
-                tts.speak("I didn't catch that, please try again!")
+        intent, response = executor.responses.get()
+        if callable(response):
+            try:
+                response = response()
+            except Exception as e:
+                print(f"Error in '{intent}' handler: {e}")
+                response = ERROR_RESPONSE
+        if intent == "exit":
+            tts.speak(response)
+            return
+        tts.say(response or NOT_UNDERSTOOD)
+
+def run_jarvis(profile_startup=False, stage_stats=False):
+    metrics.start_exporters()
+    processor.start_model_reloading()
+    warmup_threads = startup.warm_in_background(BACKGROUND_WARMUP)
+    tts.speak(GREETING)
+    tts.prerender(PRERENDER_PHRASES)
+
+    if profile_startup:
+        for thread in warmup_threads:
+            thread.join()
+        stt.init_stt()
+        startup.mark("first_prompt")
+        print(startup.report())
+
+    executor = ActionExecutor(timeouts=ACTION_TIMEOUTS,
+                              responses=queue.Queue(maxsize=PIPELINE_QUEUE_SIZE))
+    pipeline = build_pipeline(executor)
+    tts.WORKER.stats = pipeline.track("tts", executor.responses)
+    pipeline.start()
+    try:
+        speak_responses(executor)
+    finally:
+        pipeline.stop()
+        executor.shutdown()
+        if stage_stats:
+            print(pipeline.report())
+            if stt.WAKE_WORD:
+                print(wake_word.STATS.report())
 
 if __name__ == "__main__":
-    run_jarvis()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="J.A.R.V.I.S. voice assistant")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print per-component import and init times once startup has finished")
+    parser.add_argument("--stage-stats", action="store_true",
+                        help="print per-stage queue depth and latency on exit")
+    parser.add_argument("--headless", nargs="?", const="-", metavar="SOURCE",
+                        help="no audio: read commands from stdin (default), a file, unix:/path or tcp:host:port "
+                             "and write responses as JSON lines")
+    parser.add_argument("--log-level", default=config_loader.load_settings().get("log_level", "WARNING"),
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper,
+                        help="verbosity of the diagnostic log on stderr (default from settings.json)")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.headless:
+        run_headless_jarvis(args.headless)
+    else:
+        run_jarvis(profile_startup=args.profile_startup, stage_stats=args.stage_stats)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import io
+import json
+
+from jarvis_core.headless import serve_lines
+
+
+def _handle(command):
+    if command == "boom":
+        raise ValueError("bad command")
+    return {'command': command, 'intent': 'exit' if command == "bye" else 'greet', 'response': command.upper()}
+
+
+def test_error_line_keeps_the_session_going():
+    out = io.StringIO()
+    serve_lines(io.StringIO("hello\nboom\n\nhi\nbye\nnever read\n"), out, _handle)
+
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [result['command'] for result in results] == ["hello", "boom", "hi", "bye"]
+    assert results[1] == {'command': "boom", 'intent': None, 'error': "bad command"}
+    assert 'error' not in results[2]
@@ -0,0 +1,94 @@
+import pytest
+
+from jarvis_core.ml import compact_model
+from jarvis_core.ml.intent_classifier import IntentClassifier
+from tests.test_model_manager import INTENTS, _Tokenizer, _write_data
+
+SHIPPED_MODEL_PATH = 'jarvis_core/ml/model'
+
+
+@pytest.fixture
+def trained(tmp_path):
+    classifier = IntentClassifier(nlp=_Tokenizer(), featurizer='tfidf')
+    classifier.train(_write_data(tmp_path / "train.json", INTENTS))
+    return classifier
+
+
+@pytest.mark.parametrize("model_format", ["joblib", "compact"])
+def test_out_of_vocabulary_input_is_unknown(trained, tmp_path, model_format):
+    trained.save_model(str(tmp_path / "model"))
+    classifier = IntentClassifier(nlp=_Tokenizer())
+    classifier.load_model(str(tmp_path / "model"), model_format)
+
+    for text in ("blorp zzz", "xyzzy"):
+        assert classifier.predict(text) == IntentClassifier.NO_EVIDENCE_INTENT
+        assert classifier.predict_top_k(text) == [(IntentClassifier.NO_EVIDENCE_INTENT, 1.0)]
+    assert classifier.predict_batch(["blorp zzz", "what time is it"]) == [IntentClassifier.NO_EVIDENCE_INTENT, 'get_time']
+    assert classifier.predict_top_k("what time is it", k=1)[0][0] == 'get_time'
+
+
+def test_shipped_model_is_calibrated_and_compact():
+    classifier = IntentClassifier(nlp=_Tokenizer())
+    assert classifier.load_model(SHIPPED_MODEL_PATH)
+
+    assert classifier.compact is not None  # 'auto' loading needs no sklearn
+    assert classifier.calibrated
+    assert classifier.confidence_threshold is not None
+    assert classifier.predict("blorp zzz") == IntentClassifier.NO_EVIDENCE_INTENT
+    assert classifier.predict("what time is it") == 'get_time'
+
+
+def _hashing_classifier():
+    return IntentClassifier(nlp=_Tokenizer(), featurizer='hashing')
+
+
+def test_hashing_model_trains_incrementally(tmp_path):
+    classifier = _hashing_classifier()
+    classifier.train(_write_data(tmp_path / "train.json", INTENTS))
+
+    assert classifier.incremental
+    assert classifier.predict_batch(["what time is it", "weather in london", "hello jarvis"]) == \
+        ['get_time', 'get_weather', 'greet']
+
+
+def test_update_learns_only_new_patterns(tmp_path):
+    classifier = _hashing_classifier()
+    classifier.train(_write_data(tmp_path / "train.json", {tag: patterns[:4] for tag, patterns in INTENTS.items()}))
+    version = classifier.model_version
+    full_data = _write_data(tmp_path / "full.json", INTENTS)
+
+    assert classifier.update(full_data) == sum(len(patterns) - 4 for patterns in INTENTS.values())
+    assert classifier.model_version != version
+    assert len(classifier.trained_patterns) == sum(len(patterns) for patterns in INTENTS.values())
+    assert classifier.update(full_data) == 0
+
+
+def test_update_rejects_a_new_intent(tmp_path):
+    classifier = _hashing_classifier()
+    classifier.train(_write_data(tmp_path / "train.json", INTENTS))
+
+    with pytest.raises(ValueError, match="full retrain"):
+        classifier.update(_write_data(tmp_path / "more.json", {**INTENTS, 'get_date': ["what's the date"]}))
+
+
+def test_update_rejects_a_tfidf_model(trained, tmp_path):
+    with pytest.raises(ValueError, match="only 'hashing' models"):
+        trained.update(_write_data(tmp_path / "train.json", INTENTS))
+
+
+def test_hashing_model_survives_save_and_load(tmp_path):
+    model_path = str(tmp_path / "model")
+    data_path = _write_data(tmp_path / "train.json", INTENTS)
+    classifier = _hashing_classifier()
+    classifier.train(data_path)
+    classifier.save_model(model_path)
+
+    loaded = IntentClassifier(nlp=_Tokenizer())
+    assert loaded.load_model(model_path)
+
+    assert not compact_model.exists(model_path)
+    assert loaded.compact is None
+    assert loaded.featurizer == 'hashing' and loaded.incremental
+    texts = [pattern for patterns in INTENTS.values() for pattern in patterns]
+    assert loaded.predict_batch(texts) == classifier.predict_batch(texts)
+    assert loaded.update(data_path) == 0  # The trained patterns were saved with it
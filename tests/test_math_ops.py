@@ -0,0 +1,141 @@
+import math
+import subprocess
+import sys
+
+import pytest
+
+from jarvis_core.actions import math_ops
+
+
+@pytest.mark.parametrize("expression", [
+    "(1).__class__",
+    "math.pi",
+    "lambda: 1",
+    "[x for x in range(3)]",
+    "(x for x in range(3))",
+    "'text'",
+    "1 if 2 else 3",
+    "abs(x=1)",
+])
+def test_rejects_disallowed_syntax(expression):
+    with pytest.raises(SyntaxError):
+        math_ops.compile_expression(expression)
+
+
+@pytest.mark.parametrize("expression", [
+    "x + 1",
+    "__import__('os')",
+    "open('/etc/passwd')",
+    "eval('1')",
+    "exit()",
+])
+def test_rejects_names_outside_the_whitelist(expression):
+    with pytest.raises(NameError):
+        math_ops.compile_expression(expression)
+
+
+def test_rejection_happens_before_evaluation():
+    # The whole tree is checked at compile time, so nothing to the left of the bad call runs.
+    with pytest.raises(NameError):
+        math_ops.compile_expression("factorial(100000) + __import__('os')")
+
+
+@pytest.mark.parametrize("expression", ["9**9**9", "factorial(100000)", "2 ** 100000", "(-3) ** 99999"])
+def test_overflow_guards(expression):
+    with pytest.raises(OverflowError):
+        math_ops.compile_expression(expression)()
+    assert math_ops.evaluate_expression(expression) == "The result of the calculation is too large to handle."
+
+
+def test_checked_helpers_allow_values_within_the_limits():
+    assert math_ops._checked_power(2, 10) == 1024
+    assert math_ops._checked_power(2, -1) == 0.5
+    assert math_ops._checked_power(1, 10 ** 9) == 1
+    assert math_ops._checked_factorial(math_ops.MAX_FACTORIAL_ARGUMENT) == math.factorial(math_ops.MAX_FACTORIAL_ARGUMENT)
+    with pytest.raises(OverflowError):
+        math_ops._checked_factorial(math_ops.MAX_FACTORIAL_ARGUMENT + 1)
+
+
+@pytest.mark.parametrize("expression, value", [
+    ("5 + 3", 8),
+    ("10 - 4 * 2", 2),
+    ("100 / 8", 12.5),
+    ("7 // 2", 3),
+    ("10 % 3", 1),
+    ("-2 ** 2", -4),
+    ("2 ** 3 ** 2", 512),
+    ("sqrt(16) + pow(2, 4)", 20.0),
+    ("factorial(5)", 120),
+    ("round(pi, 2)", 3.14),
+    ("abs(-5) * e", 5 * math.e),
+])
+def test_arithmetic(expression, value):
+    assert math_ops.compile_expression(expression)() == pytest.approx(value)
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("6 * 7", "The result is 42"),
+    ("100 / 4", "The result is 25"),
+    ("sin(radians(30))", "The result is 0.5"),
+    ("10 / 0", "Sorry, I can't divide by zero."),
+])
+def test_evaluate_expression_messages(expression, message):
+    assert math_ops.evaluate_expression(expression) == message
+
+
+def _bulk_expressions():
+    size = math_ops.VECTORIZE_MIN_GROUP * 3
+    expressions = []
+    expressions += [f"sin(radians({angle}))" for angle in range(0, 15 * size, 15)]  # Includes exact 0.5 and 1
+    expressions += [f"sqrt({n})" for n in range(-size // 2, size // 2)]               # Negative: domain error
+    expressions += [f"log({n})" for n in range(-2, size - 2)]                         # 0 and below: domain error
+    expressions += [f"10 / {n}" for n in range(-size // 2, size // 2)]                # Division by zero
+    expressions += [f"{n} ** 2 + {n} * 0.5" for n in range(size)]
+    expressions += [f"2 ** {n}" for n in range(40, 40 + size)]                        # Beyond float64's exact integers
+    expressions += [f"factorial({n})" for n in range(size)]                           # No ufunc: scalar path only
+    expressions += ["5 +", "x * 2", "__import__('os')", "9**9**9", "round(2.5)", "1e308 * 10"]
+    return expressions
+
+
+def test_evaluate_many_matches_evaluate_expression(monkeypatch):
+    expressions = _bulk_expressions()
+    expected = [math_ops.evaluate_expression(expression) for expression in expressions]
+
+    scalar_calls = []
+    evaluate = math_ops._evaluate
+    monkeypatch.setattr(math_ops, '_evaluate', lambda *args: scalar_calls.append(args[0]) or evaluate(*args))
+
+    assert math_ops.evaluate_many(expressions) == expected
+    # The groups really went through NumPy; only the rows it can't reproduce exactly didn't.
+    assert not {"sin(radians(15))", "sqrt(5)", "log(5)", "10 / 3", "3 ** 2 + 3 * 0.5"} & set(scalar_calls)
+    assert "sqrt(-1)" in scalar_calls and "10 / 0" in scalar_calls
+
+
+def test_evaluate_many_small_and_empty_batches():
+    assert math_ops.evaluate_many([]) == []
+    assert math_ops.evaluate_many(["1 + 1", "10 / 0"]) == ["The result is 2", "Sorry, I can't divide by zero."]
+
+
+def test_evaluate_many_logs_one_warning_per_batch(caplog):
+    expressions = [f"sqrt({-n})" for n in range(1, 3 * math_ops.VECTORIZE_MIN_GROUP)] + ["acos(2)"]
+
+    with caplog.at_level('WARNING', logger=math_ops.__name__):
+        math_ops.evaluate_many(expressions)
+
+    warnings = [record for record in caplog.records if record.levelname == 'WARNING']
+    assert len(warnings) == 1
+    assert f"in {len(expressions)} of {len(expressions)} expressions" in warnings[0].getMessage()
+
+
+def test_batch_command_line(tmp_path):
+    queries = tmp_path / "queries.txt"
+    queries.write_text("what is 50 times 12\n\nfive hundred and twenty plus one\nsquare root of 16\n")
+    expressions = "6 * 7\n10 / 0\nsqrt(-1)\n"
+
+    parsed = subprocess.run([sys.executable, "-m", "jarvis_core.actions.math_ops", "--parse", str(queries)],
+                            capture_output=True, text=True, check=True)
+    raw = subprocess.run([sys.executable, "-m", "jarvis_core.actions.math_ops", "-"],
+                         input=expressions, capture_output=True, text=True, check=True)
+
+    assert parsed.stdout.splitlines() == ["The result is 600", "The result is 521", "The result is 4"]
+    assert raw.stdout.splitlines() == [math_ops.evaluate_expression(line) for line in expressions.splitlines()]
@@ -0,0 +1,33 @@
+import pytest
+
+from jarvis_core.actions.math_ops import FORMAT_PROBLEM_RESPONSE, UNPARSEABLE_EXPRESSION, evaluate_expression
+from jarvis_core.nlp._math_parser import parse_math_query
+
+
+@pytest.mark.parametrize("query, expression", [
+    ("what is 50 times 12", "50 * 12"),
+    ("five hundred and twenty plus one", "520 + 1"),
+    ("two thousand and five minus one hundred and one", "2005 - 101"),
+    ("one hundred and twenty-five times two", "125 * 2"),
+    ("add five and seven", "5 + 7"),
+    ("add 5 and 7 and 8", "5 + 7 + 8"),
+    ("sum of one and two and three", "1 + 2 + 3"),
+    ("difference between 10 and 3 and 2", "10 - 3 - 2"),
+    ("multiply 2 by 3 by 4", "2 * 3 * 4"),
+    ("subtract 3 from 10", "10 - 3"),
+    ("what is the sine of 30 degrees", "sin(radians(30))"),
+])
+def test_parses_spoken_queries(query, expression):
+    assert parse_math_query(query) == expression
+
+
+@pytest.mark.parametrize("query", [
+    "subtract 3 from 10 from 20",  # "from" takes a single operand
+    "sum of 5 and",
+    "5 plus",
+    "(" * 5000 + "1",  # Deep enough to exhaust the recursion limit
+    "minus " * 5000 + "1",
+])
+def test_unparseable_queries_are_reported_as_a_format_problem(query):
+    assert parse_math_query(query) == UNPARSEABLE_EXPRESSION
+    assert evaluate_expression(parse_math_query(query)) == FORMAT_PROBLEM_RESPONSE
@@ -0,0 +1,106 @@
+import json
+import re
+import threading
+from types import SimpleNamespace
+
+from jarvis_core.ml.intent_classifier import IntentClassifier
+from jarvis_core.ml.model_manager import ModelManager
+from jarvis_core.utils.startup import LazyResource
+
+INTENTS = {
+    'get_time': ["what time is it", "tell me the time", "time please", "current time", "what's the time now",
+                 "do you know the time"],
+    'get_weather': ["weather in london", "is it raining", "what's the weather like", "forecast for paris",
+                    "weather please", "will it rain today"],
+    'greet': ["hello", "hi there", "hey jarvis", "good morning", "hello jarvis", "hi"],
+}
+HOLDOUT = {'get_time': ["what is the time"], 'get_weather': ["weather in berlin"], 'greet': ["hello there"]}
+
+
+class _Tokenizer:
+    """Just enough of a spaCy pipeline for the classifier's preprocessing."""
+
+    pipe_names = []
+
+    def make_doc(self, text):
+        return [SimpleNamespace(lower_=word.lower(), is_punct=not word[0].isalnum())
+                for word in re.findall(r"\w+|[^\w\s]", text)]
+
+    def pipe(self, texts, **kwargs):
+        return (self.make_doc(text) for text in texts)
+
+
+def _write_data(path, intents):
+    path.write_text(json.dumps({'intents': [{'tag': tag, 'patterns': patterns} for tag, patterns in intents.items()]}))
+    return str(path)
+
+
+def _train(data_path, model_path):
+    classifier = IntentClassifier(nlp=_Tokenizer(), featurizer='tfidf')
+    classifier.train(data_path)
+    classifier.save_model(model_path)
+
+
+def test_retrain_into_watched_directory_then_reload(tmp_path):
+    model_path = str(tmp_path / "model")
+    _train(_write_data(tmp_path / "train.json", INTENTS), model_path)
+    holdout_path = _write_data(tmp_path / "holdout.json", HOLDOUT)
+
+    def load():
+        classifier = IntentClassifier(nlp=_Tokenizer())
+        return classifier if classifier.load_model(model_path) else None
+
+    resource = LazyResource("intent_model", load)
+    manager = ModelManager(resource, load, holdout_path, min_accuracy=0.5)
+    old = resource.get()
+    assert old.compact is not None  # Memory-mapped from model_path
+
+    stop = threading.Event()
+    errors = []
+
+    def keep_predicting():
+        while not stop.is_set():
+            try:
+                assert old.predict_top_k("what time is it", k=1)[0][0] == 'get_time'
+            except Exception as e:
+                errors.append(e)
+                return
+
+    predictor = threading.Thread(target=keep_predicting)
+    predictor.start()
+    # Retrain on less data into the same directory while the old model is in use.
+    smaller = {tag: patterns[:4] for tag, patterns in INTENTS.items()}
+    _train(_write_data(tmp_path / "smaller.json", smaller), model_path)
+    stop.set()
+    predictor.join()
+
+    assert not errors
+    assert old.predict("tell me the time") == 'get_time'
+    assert manager.reload_now()
+    new = resource.get()
+    assert new is not old
+    assert new.model_version != old.model_version
+    assert new.predict("weather in berlin") == 'get_weather'
+
+
+def test_reload_rejects_worse_model(tmp_path):
+    model_path = str(tmp_path / "model")
+    _train(_write_data(tmp_path / "train.json", INTENTS), model_path)
+    holdout_path = _write_data(tmp_path / "holdout.json", HOLDOUT)
+
+    def load():
+        classifier = IntentClassifier(nlp=_Tokenizer())
+        return classifier if classifier.load_model(model_path) else None
+
+    resource = LazyResource("intent_model", load)
+    manager = ModelManager(resource, load, holdout_path)
+    current = resource.get()
+
+    # Every intent's patterns filed under the wrong tag.
+    tags = list(INTENTS)
+    shuffled = {tags[(i + 1) % len(tags)]: INTENTS[tag] for i, tag in enumerate(tags)}
+    _train(_write_data(tmp_path / "wrong.json", shuffled), model_path)
+
+    assert not manager.reload_now()
+    assert resource.get() is current
+    assert manager.rejected == 1
@@ -0,0 +1,90 @@
+import wave
+
+from jarvis_core import stt
+
+
+def _write_wav(path, seconds=0.2, rate=16000):
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b"\0\0" * int(seconds * rate))
+
+
+def test_replay_transcripts_in_order(tmp_path):
+    script = tmp_path / "commands.txt"
+    script.write_text("# a comment\nWhat time is it\n\nopen notepad\n")
+    backend = stt.ReplayBackend(str(script))
+
+    heard = []
+    while True:
+        audio = backend.capture()
+        if backend.exhausted:
+            break
+        heard.append(backend.transcribe(audio))
+
+    assert heard == ["What time is it", "open notepad"]
+    assert backend.capture() is None
+
+
+def test_replay_wav_uses_sidecar_transcript(tmp_path):
+    _write_wav(tmp_path / "01.wav")
+    (tmp_path / "01.txt").write_text("tell me the date\n")
+    _write_wav(tmp_path / "02.wav")
+    backend = stt.ReplayBackend(str(tmp_path))
+
+    first = backend.capture()
+    assert first.audio.sample_rate == 16000
+    assert backend.transcribe(first) == "tell me the date"
+    assert backend.transcribe(backend.capture()) is None
+    backend.capture()
+    assert backend.exhausted
+
+
+def test_replay_wav_with_recognizer_backend(tmp_path):
+    class Echo(stt.SpeechBackend):
+        def transcribe(self, audio):
+            return f"{len(audio.get_raw_data())} bytes"
+
+    _write_wav(tmp_path / "a.wav", seconds=0.1)
+    backend = stt.ReplayBackend(str(tmp_path), backend=Echo())
+    assert backend.transcribe(backend.capture()) == "3200 bytes"
+
+
+def test_recognize_lowercases_backend_text(tmp_path, monkeypatch):
+    script = tmp_path / "commands.txt"
+    script.write_text("Search Wikipedia for Mars\n")
+    backend = stt.ReplayBackend(str(script))
+    monkeypatch.setattr(stt.BACKEND, "get", lambda: backend)
+
+    assert stt.listen_for_command() == "search wikipedia for mars"
+    assert stt.listen_for_command() is None
+
+
+def test_capture_and_recognition_are_timed(tmp_path, monkeypatch):
+    script = tmp_path / "commands.txt"
+    script.write_text("what time is it\n")
+    monkeypatch.setattr(stt.BACKEND, "get", lambda: stt.ReplayBackend(str(script)))
+    captures = stt.metrics.histogram(stt.metrics.STAGE_SECONDS, stage='stt_capture')
+    recognitions = stt.metrics.histogram(stt.metrics.STAGE_SECONDS, stage='stt_recognize')
+    before = captures.count, recognitions.count
+
+    stt.recognize(stt.capture_audio())
+
+    assert (captures.count, recognitions.count) == (before[0] + 1, before[1] + 1)
+
+
+def test_replay_with_wake_word_only_passes_addressed_phrases(tmp_path, monkeypatch):
+    script = tmp_path / "commands.txt"
+    script.write_text("what a nice day\nJarvis, what time is it\nhey jarvis\n")
+    stats = stt.wake_word.WakeWordStats()
+    monkeypatch.setattr(stt, "WAKE_WORD", "jarvis")
+    monkeypatch.setattr(stt.wake_word, "STATS", stats)
+    backend = stt.ReplayBackend(str(script))
+
+    captured = [backend.capture() for _ in range(3)]
+
+    assert captured == [None, "what time is it", None]
+    assert stats.snapshot()['wake_triggers'] == 2
+    assert stats.snapshot()['false_triggers'] == 1
+    assert stats.snapshot()['ignored_phrases'] == 1
@@ -0,0 +1,47 @@
+import os
+import wave
+
+from jarvis_core.tts_cache import AudioCache
+
+
+def _render(path, frames=1000):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(b"\0\0" * frames)
+
+
+def test_eviction_drops_least_recently_played_first(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=3000)
+    old, new = cache.path_for("old", "voice", 200), cache.path_for("new", "voice", 200)
+    _render(old)
+    os.utime(old, (1, 1))
+    _render(new)
+
+    assert cache.add(new)
+    assert not os.path.exists(old)
+    assert cache.get("new", "voice", 200) == new
+
+
+def test_eviction_skips_renders_in_progress(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=1000)
+    partial = cache.partial_path_for(cache.path_for("still rendering", "voice", 200))
+    _render(partial, frames=4000)
+    os.utime(partial, (1, 1))
+    done = cache.path_for("done", "voice", 200)
+    _render(done, frames=100)
+
+    cache.add(done)
+
+    assert os.path.exists(partial)
+
+
+def test_unplayable_render_is_not_cached(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10 ** 6)
+    path = cache.path_for("broken", "voice", 200)
+    with open(path, 'wb') as f:
+        f.write(b"not a wav")
+
+    assert not cache.add(path)
+    assert cache.get("broken", "voice", 200) is None
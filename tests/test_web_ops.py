@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from jarvis_core.actions import web_ops
+from jarvis_core.utils.startup import LazyResource
+from jarvis_core.utils.ttl_cache import TTLCache
+
+LONDON = {
+    'cod': 200, 'name': "London",
+    'main': {'temp': 12.5, 'feels_like': 11.0, 'humidity': 80},
+    'weather': [{'description': "light rain"}],
+    'sys': {'sunrise': 1700000000, 'sunset': 1700030000},
+}
+
+
+class _WeatherStub(ThreadingHTTPServer):
+    """Answers each request with the next scripted (status, delay_seconds) reply; the last one repeats."""
+
+    daemon_threads = True
+
+    def __init__(self, replies):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.replies = list(replies)
+        self.requests = []
+
+    def next_reply(self):
+        return self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        status, delay = self.server.next_reply()
+        time.sleep(delay)
+        body = json.dumps(LONDON if status == 200 else {'cod': status, 'message': "unavailable"}).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up waiting.
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def weather_stub(monkeypatch):
+    servers = []
+
+    def start(*replies):
+        server = _WeatherStub(replies)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setattr(web_ops, 'WEATHER_API_URL', f"http://127.0.0.1:{server.server_port}/data/2.5/weather")
+        return server
+
+    monkeypatch.setattr(web_ops, 'openweathermap_key', "test-key")
+    monkeypatch.setattr(web_ops, 'WEATHER_CACHE', TTLCache(300))
+    # A fresh session, so no pooled connection or retry state leaks between tests.
+    monkeypatch.setattr(web_ops, 'HTTP_SESSION', LazyResource("http_session", web_ops._create_http_session))
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_repeated_lookup_is_served_from_the_cache(weather_stub):
+    server = weather_stub((200, 0))
+
+    first = web_ops.get_weather_action("London")
+    second = web_ops.get_weather_action("  london ")
+
+    assert first.startswith("Temperature in London is: 12.5°C")
+    assert second == first
+    assert len(server.requests) == 1
+    assert "appid=test-key" in server.requests[0]
+    # Another unit is another report.
+    assert "°F" in web_ops.get_weather_action("London", "fahrenheit")
+    assert len(server.requests) == 2
+
+
+def test_retries_after_service_unavailable(weather_stub):
+    server = weather_stub((503, 0), (200, 0))
+
+    report = web_ops.get_weather_action("London")
+
+    assert report.startswith("Temperature in London is")
+    assert len(server.requests) == 2
+
+
+def test_gives_up_after_the_retries(weather_stub):
+    server = weather_stub((503, 0))
+
+    report = web_ops.get_weather_action("London")
+
+    assert report == "Sorry, I couldn't reach the weather service for London right now."
+    assert len(server.requests) == web_ops.HTTP_MAX_RETRIES + 1
+    assert web_ops.WEATHER_CACHE.get(("london", "metric")) is None
+
+
+def test_timeout_message(weather_stub, monkeypatch):
+    monkeypatch.setattr(web_ops, 'HTTP_TIMEOUT_SECONDS', 0.2)
+    weather_stub((200, 1.0))
+
+    start = time.monotonic()
+    report = web_ops.get_weather_action("London")
+
+    assert report == "Sorry, I couldn't reach the weather service for London right now."
+    # Every attempt is cut short by the timeout rather than waiting for the slow reply.
+    assert time.monotonic() - start < (web_ops.HTTP_MAX_RETRIES + 1) * 1.0
@@ -1,14 +1,36 @@
+import argparse
+
 from jarvis_core.ml.intent_classifier import IntentClassifier
+from jarvis_core.ml.model_manager import holdout_accuracy
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the intent classifier")
+    parser.add_argument("--incremental", action="store_true",
+                        help="teach the saved model only the patterns added since it was trained "
+                             "(needs intent_featurizer 'hashing' in settings.json)")
+    args = parser.parse_args()
+
     # Path of training data
     training_data_path = 'config/training_data.json'
     # Path where the trained model will be saved
     model_save_path = 'jarvis_core/ml/model'
+    # Labelled commands kept out of training; a running JARVIS validates reloaded models on them
+    holdout_data_path = 'config/holdout_data.json'
 
     classifier = IntentClassifier()
-    classifier.train(training_data_path)
+    if args.incremental:
+        if not classifier.load_model(model_save_path, model_format="joblib"):
+            raise SystemExit(1)
+        try:
+            classifier.update(training_data_path)
+        except ValueError as e:
+            raise SystemExit(f"Cannot update incrementally: {e} Run train_model.py without --incremental.")
+    else:
+        classifier.train(training_data_path)
 
+    threshold = classifier.choose_confidence_threshold(holdout_data_path)
+    if threshold is not None:
+        print(f"Confidence threshold chosen on the held-out set: {threshold:.2f}")
     classifier.save_model(model_save_path)
 
     print("\n--- Testing Model ---")
@@ -22,6 +44,9 @@ if __name__ == '__main__':
         "turn the sound down",
         "that's all for now Jarvis"
     ]
-    for test in tests:
-        intent = classifier.predict(test)
-        print(f"'{test}' -> Predicted Intent: '{intent}'")
\ No newline at end of file
+    for test, intent in zip(tests, classifier.predict_batch(tests)):
+        print(f"'{test}' -> Predicted Intent: '{intent}'")
+
+    accuracy = holdout_accuracy(classifier, holdout_data_path)
+    if accuracy is not None:
+        print(f"\nHeld-out accuracy: {accuracy:.2%}")
\ No newline at end of file